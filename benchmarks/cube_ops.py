@@ -0,0 +1,203 @@
+# Copyright 2021 David Zsolt Manrique
+#
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 2 of the License, or (at
+# your option) any later version.
+#
+# This program is distributed in the hope that it will be useful, but
+# WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the GNU
+# General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program; if not, write to the Free Software
+# Foundation, Inc., 51 Franklin Street, Fifth Floor, Boston, MA
+# 02110-1301 USA.
+
+# TIMES OF THE MAIN OPERATIONS ACROSS CUBE SIZES AS JSON, FOR REGRESSION TRACKING; RUNS OFFLINE WITHOUT A MOVE TABLE
+# CACHE. EVERY OPERATION IS RUN --repeat TIMES AND REPORTED AS THE MIN AND MEDIAN SECONDS PER CALL. WITH --instrument
+# THE INSTRUMENTATION COUNTERS (CALLS, TIME, BYTES ALLOCATED) OF EVERY SIZE ARE ADDED; WITH --compare THE MEDIANS ARE
+# CHECKED AGAINST AN EARLIER OUTPUT AND THE EXIT CODE IS 1 IF ONE IS SLOWER THAN --tolerance TIMES ITS BASELINE.
+#
+#   python benchmarks/cube_ops.py [--sizes 2-5,10,20,50] [--repeat 5] [--no-render] [--instrument]
+#                                 [--output results.json] [--compare baseline.json --tolerance 1.5]
+
+import argparse
+import json
+import os
+import platform
+import statistics
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import numpy  # noqa: E402
+
+from rubik_cube_permutation import RubikCube, RubikCubePermutation, instrumentation  # noqa: E402
+
+SIZES = '2-7,10,15,20,30,40,50'
+
+# LENGTH OF THE MOVE SEQUENCES AND NUMBER OF STATES OF THE BATCH CHECKS
+SEQUENCE_LENGTH = 20
+BATCH_SIZE = 1000
+
+
+def parse_sizes(text: str):
+    sizes = []
+    for part in text.split(','):
+        lo, _, hi = part.partition('-')
+        sizes.extend(range(int(lo), int(hi or lo) + 1))
+    return sizes
+
+
+def timed(fn, repeat: int, setup=None):
+    seconds = []
+    for i in range(repeat):
+        args = setup(i) if setup is not None else ()
+        start = time.perf_counter()
+        fn(*args)
+        seconds.append(time.perf_counter() - start)
+    return {'min': min(seconds), 'median': statistics.median(seconds), 'repeat': repeat}
+
+
+def bench_size(n: int, repeat: int, render: bool):
+    random = numpy.random.RandomState(n)
+    results = {}
+
+    def cold():
+        # MOVE TABLES ARE SHARED PER SIZE, THE COLD CONSTRUCTION BUILDS THEM AGAIN
+        RubikCubePermutation._MOVE_TABLES.pop(n, None)
+        return ()
+
+    results['construct_cold'] = timed(lambda: RubikCubePermutation(n), repeat, lambda i: cold())
+    results['construct_shared'] = timed(lambda: RubikCubePermutation(n), repeat)
+
+    c = RubikCube(n)
+    names = sorted(list(c._outer_layer_moves) + list(c._outer_block_moves))
+    sequences = [' '.join(random.choice(names, SEQUENCE_LENGTH)) for _ in range(repeat)]
+
+    # EVERY CALL COMPOSES A NEW SEQUENCE, THE COMPILED SEQUENCE CACHE NEVER HITS
+    results['perm_moves'] = timed(c.perm_moves, repeat, lambda i: (sequences[i],))
+    results['perm_moves_cached'] = timed(c.perm_moves, repeat, lambda i: (sequences[0],))
+
+    # move ON A CUBE THAT HAS NOT SEEN THE SEQUENCES: NEW SEQUENCES (MOVE BY MOVE), A REPEATED SEQUENCE (ONE GATHER),
+    # ONE FACE TURN AND, WHERE THE CUBE HAS THEM, ONE SLICE TURN AND NEW SEQUENCES OF SLICE TURNS (IN PLACE)
+    m = RubikCube(n)
+    new_sequences = [' '.join(random.choice(names, SEQUENCE_LENGTH)) for _ in range(repeat)]
+    m.move(sequences[0]).move(sequences[0]).move('U')
+    results['move'] = timed(m.move, repeat, lambda i: (new_sequences[i],))
+    results['move_cached'] = timed(m.move, repeat, lambda i: (sequences[0],))
+    results['move_face'] = timed(m.move, repeat, lambda i: ('U',))
+
+    m._build_move_spec_index()
+    slices = sorted(name for name in m._inner_layer_moves if 0 < m._move_spec[name][1] <= m._move_spec[name][2] < n - 1)
+    if slices:
+        slice_sequences = [' '.join(random.choice(slices, SEQUENCE_LENGTH)) for _ in range(repeat)]
+
+        # THE SPARSE FORM OF A MOVE IS BUILT ON ITS FIRST USE, NOT TIMED
+        for name in slices:
+            m.move(name)
+        results['move_slice'] = timed(m.move, repeat, lambda i: (slices[0],))
+        results['move_slices'] = timed(m.move, repeat, lambda i: (slice_sequences[i],))
+
+    results['scramble'] = timed(c.scramble, repeat, lambda i: (SEQUENCE_LENGTH, i))
+
+    state = c.initial_state()
+    states = numpy.tile(state, (BATCH_SIZE, 1))
+    results['is_state_solved'] = timed(c.is_state_solved, repeat, lambda i: (state,))
+    results['is_state_solved_batch'] = timed(c.is_state_solved, repeat, lambda i: (states,))
+
+    results['format_state'] = timed(c.format_state, repeat)
+    results['format_move'] = timed(c.format_move, repeat, lambda i: (sequences[i], True))
+
+    if render:
+        from rubik_cube_permutation import MplRubikCube
+        from rubik_cube_permutation.mpl_rubik_cube import plt
+
+        m = MplRubikCube(n)
+        m.move(sequences[0])
+
+        def view():
+            fig = m.view()
+            fig.canvas.draw()
+            plt.close(fig)
+
+        results['view'] = timed(view, repeat)
+
+    return results
+
+
+def compare(results, baseline, tolerance: float):
+    # (size, operation, median, baseline median) OF EVERY OPERATION SLOWER THAN tolerance TIMES ITS BASELINE
+    slower = []
+    for n, operations in results.items():
+        for name, stats in operations.items():
+            base = baseline.get(n, {}).get(name)
+            if base is not None and stats['median'] > tolerance * base['median']:
+                slower.append((int(n), name, stats['median'], base['median']))
+    return slower
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Times of the main operations across cube sizes')
+    parser.add_argument('--sizes', default=SIZES, help='comma separated sizes and ranges, e.g. 2-5,10,20')
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--no-render', action='store_true', help='skip MplRubikCube.view')
+    parser.add_argument('--instrument', action='store_true', help='add the instrumentation counters of every size')
+    parser.add_argument('--output', help='write the JSON to this file instead of stdout')
+    parser.add_argument('--compare', help='JSON of an earlier run to compare the medians with')
+    parser.add_argument('--tolerance', type=float, default=1.5)
+    args = parser.parse_args()
+
+    render = not args.no_render
+    if render:
+        try:
+            import matplotlib
+            matplotlib.use('Agg')
+        except ImportError:
+            render = False
+
+    # OFFLINE AND COLD: NO MOVE TABLES FROM DISK
+    RubikCubePermutation.set_cache_dir(None)
+
+    output = {'meta': {'python': platform.python_version(), 'numpy': numpy.__version__,
+                       'platform': platform.platform(), 'time': time.strftime('%Y-%m-%dT%H:%M:%S'),
+                       'repeat': args.repeat, 'render': render},
+              'results': {}}
+    if args.instrument:
+        output['instrumentation'] = {}
+
+    for n in parse_sizes(args.sizes):
+        if args.instrument:
+            instrumentation.reset()
+            instrumentation.enable(track_memory=True)
+        try:
+            output['results'][str(n)] = bench_size(n, args.repeat, render)
+        finally:
+            if args.instrument:
+                instrumentation.disable()
+                output['instrumentation'][str(n)] = instrumentation.report()
+
+        print(f'n = {n} done', file=sys.stderr)
+
+    text = json.dumps(output, indent=2)
+    if args.output:
+        with open(args.output, 'w') as f:
+            f.write(text + '\n')
+    else:
+        print(text)
+
+    if args.compare:
+        with open(args.compare) as f:
+            slower = compare(output['results'], json.load(f)['results'], args.tolerance)
+        for n, name, median, base in slower:
+            print(f'n = {n} {name}: {median:.6f} s, baseline {base:.6f} s', file=sys.stderr)
+        return 1 if slower else 0
+
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
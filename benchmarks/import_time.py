@@ -0,0 +1,76 @@
+# Copyright 2021 David Zsolt Manrique
+#
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 2 of the License, or (at
+# your option) any later version.
+#
+# This program is distributed in the hope that it will be useful, but
+# WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the GNU
+# General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program; if not, write to the Free Software
+# Foundation, Inc., 51 Franklin Street, Fifth Floor, Boston, MA
+# 02110-1301 USA.
+
+# STARTUP BUDGET OF THE HEADLESS CORE: IMPORTING rubik_cube_permutation ON TOP OF numpy MUST STAY WITHIN
+# BUDGET_MS AND MUST NOT PULL IN MATPLOTLIB OR MULTIPROCESSING. EACH RUN IS A FRESH INTERPRETER.
+#
+#   python benchmarks/import_time.py [--runs 7] [--budget-ms 30]
+
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+
+BUDGET_MS = 30.0
+
+_PROBE = '''
+import sys, time
+t0 = time.perf_counter()
+import numpy
+t1 = time.perf_counter()
+import rubik_cube_permutation
+t2 = time.perf_counter()
+heavy = sorted(m for m in ('matplotlib', 'matplotlib.pyplot', 'multiprocessing', 'concurrent.futures')
+               if m in sys.modules)
+print((t1 - t0) * 1000, (t2 - t1) * 1000, ','.join(heavy))
+'''
+
+
+def measure(runs: int):
+    root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    env = dict(os.environ, PYTHONPATH=os.pathsep.join([root] + [p for p in [os.environ.get('PYTHONPATH')] if p]))
+
+    numpy_ms, core_ms, heavy = [], [], set()
+    for _ in range(runs):
+        out = subprocess.run([sys.executable, '-c', _PROBE], env=env, check=True, capture_output=True, text=True)
+        t_numpy, t_core, modules = out.stdout.split(' ')
+        numpy_ms.append(float(t_numpy))
+        core_ms.append(float(t_core))
+        heavy.update(m for m in modules.strip().split(',') if m)
+
+    return {'numpy_ms': statistics.median(numpy_ms), 'core_ms': statistics.median(core_ms),
+            'heavy_modules': sorted(heavy)}
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Import time of the headless core')
+    parser.add_argument('--runs', type=int, default=7)
+    parser.add_argument('--budget-ms', type=float, default=BUDGET_MS)
+    args = parser.parse_args()
+
+    result = measure(args.runs)
+    result['budget_ms'] = args.budget_ms
+    result['ok'] = result['core_ms'] <= args.budget_ms and not result['heavy_modules']
+    print(json.dumps(result, indent=2))
+
+    return 0 if result['ok'] else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
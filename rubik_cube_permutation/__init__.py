@@ -1,3 +1,30 @@
 from .rubik_cube_permutation import RubikCubePermutation
 from .rubik_cube import RubikCube
-from .mpl_rubik_cube import MplRubikCube
\ No newline at end of file
+from .rubik_cube_batch import RubikCubeBatch
+from .rubik_cube_scrambler import RubikCubeScrambler
+from .rubik_cube_graph import RubikCubeGraph
+from .rubik_cube_solver import RubikCubeSolver
+from .rubik_cube_group import RubikCubeGroup
+from .rubik_cube_cubies import RubikCubeCubies
+from .rubik_cube_pattern_index import RubikCubePatternIndex
+
+# THE VISUALISATION (MATPLOTLIB) AND THE PROCESS POOL (MULTIPROCESSING) ARE IMPORTED ON FIRST ACCESS ONLY
+_LAZY_IMPORTS = {'MplRubikCube': '.mpl_rubik_cube', 'RubikCubePool': '.rubik_cube_pool'}
+
+__all__ = ['RubikCubePermutation', 'RubikCube', 'RubikCubeBatch', 'RubikCubeScrambler',
+           'RubikCubeGraph', 'RubikCubeSolver', 'RubikCubeGroup', 'RubikCubeCubies',
+           'RubikCubePatternIndex'] + list(_LAZY_IMPORTS)
+
+
+def __getattr__(name):
+    if name in _LAZY_IMPORTS:
+        from importlib import import_module
+        value = getattr(import_module(_LAZY_IMPORTS[name], __name__), name)
+        globals()[name] = value
+        return value
+
+    raise AttributeError(f'module {__name__!r} has no attribute {name!r}')
+
+
+def __dir__():
+    return sorted(list(globals()) + list(_LAZY_IMPORTS))
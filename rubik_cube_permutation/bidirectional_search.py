@@ -0,0 +1,121 @@
+# Copyright 2021 David Zsolt Manrique
+#
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 2 of the License, or (at
+# your option) any later version.
+#
+# This program is distributed in the hope that it will be useful, but
+# WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the GNU
+# General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program; if not, write to the Free Software
+# Foundation, Inc., 51 Franklin Street, Fifth Floor, Boston, MA
+# 02110-1301 USA.
+
+# MEET-IN-THE-MIDDLE SEARCH: BREADTH-FIRST FROM THE START STATE WITH THE MOVES AND FROM THE TARGET STATE WITH THEIR
+# INVERSES, ALWAYS GROWING THE SMALLER FRONTIER; EVERY LEVEL OF A SIDE IS A SORTED ARRAY OF 64-BIT HASHES OF THE PACKED
+# STATES WITH THE PARENT AND THE MOVE THAT REACHED THEM, THE TWO SIDES MEET WHERE THEIR HASHES MATCH
+
+import numpy
+
+from .state_encoding import hash_states
+
+
+class _Side(object):
+
+    def __init__(self, state, perms):
+        self.perms = numpy.asarray(perms).ravel()
+        self.moves = len(perms)
+        self.frontier = numpy.asarray(state)[None]
+
+        # PER LEVEL: SORTED KEYS, PARENT (POSITION IN THE PREVIOUS LEVEL) AND MOVE
+        self.keys = [hash_states(self.frontier)]
+        self.parents = [numpy.zeros(1, dtype=numpy.int64)]
+        self.move_index = [numpy.zeros(1, dtype=numpy.int64)]
+
+    def find(self, keys):
+        # (LEVEL, POSITION) OF EVERY KEY, LEVEL -1 WHERE THE SIDE HAS NOT SEEN IT
+        level = numpy.full(len(keys), -1)
+        position = numpy.zeros(len(keys), dtype=numpy.int64)
+        for d, level_keys in enumerate(self.keys):
+            pos = numpy.minimum(numpy.searchsorted(level_keys, keys), len(level_keys) - 1)
+            hit = (level == -1) & (level_keys[pos] == keys)
+            level[hit] = d
+            position[hit] = pos[hit]
+        return level, position
+
+    def expand(self, chunk_size: int):
+        size = self.frontier.shape[1]
+
+        states = []
+        keys = []
+        parents = []
+        moves = []
+        for start in range(0, len(self.frontier), chunk_size):
+            children = numpy.take(self.frontier[start:start + chunk_size], self.perms, axis=1).reshape(-1, size)
+            children_keys = hash_states(children)
+
+            new = self.find(children_keys)[0] == -1
+            states.append(children[new])
+            keys.append(children_keys[new])
+            parents.append(start + numpy.flatnonzero(new) // self.moves)
+            moves.append(numpy.flatnonzero(new) % self.moves)
+
+        keys = numpy.concatenate(keys)
+        order = numpy.argsort(keys, kind='stable')
+        keys = keys[order]
+        first = numpy.ones(len(keys), dtype=bool)
+        first[1:] = keys[1:] != keys[:-1]
+        order = order[first]
+
+        self.frontier = numpy.concatenate(states)[order]
+        self.keys.append(keys[first])
+        self.parents.append(numpy.concatenate(parents)[order])
+        self.move_index.append(numpy.concatenate(moves)[order])
+
+    def path(self, level: int, position: int):
+        # MOVES FROM THE ROOT OF THE SIDE TO THE STATE AT (level, position), IN THE ORDER THEY WERE APPLIED
+        moves = []
+        for d in range(level, 0, -1):
+            moves.append(int(self.move_index[d][position]))
+            position = self.parents[d][position]
+        return moves[::-1]
+
+
+def bidirectional_search(start, target, perms, inverse_perms, max_depth: int, chunk_size: int = 65536):
+    # INDICES OF THE SHORTEST SEQUENCE OF perms THAT TAKES start TO target (state[p] IS state AFTER A MOVE p), OR None
+    # IF THERE IS NONE OF AT MOST max_depth MOVES
+    start = numpy.asarray(start)
+    target = numpy.asarray(target)
+    if (start == target).all():
+        return []
+
+    forward = _Side(start, perms)
+    backward = _Side(target, inverse_perms)
+
+    for _ in range(max_depth):
+        side, other = (forward, backward) if len(forward.frontier) <= len(backward.frontier) else (backward, forward)
+        if len(side.frontier) == 0:
+            return None
+
+        side.expand(chunk_size)
+
+        level, position = other.find(side.keys[-1])
+        hits = numpy.flatnonzero(level >= 0)
+
+        # SHORTEST FIRST; A MATCH IS ONLY TAKEN AFTER THE SEQUENCE IS CHECKED ON THE STATES, HASHES MAY COLLIDE
+        for i in hits[numpy.argsort(level[hits], kind='stable')]:
+            moves = side.path(len(side.keys) - 1, i)
+            other_moves = other.path(level[i], position[i])
+            path = moves + other_moves[::-1] if side is forward else other_moves + moves[::-1]
+
+            state = start
+            for m in path:
+                state = state[perms[m]]
+            if (state == target).all():
+                return path
+
+    return None
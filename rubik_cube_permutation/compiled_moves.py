@@ -0,0 +1,180 @@
+# Copyright 2021 David Zsolt Manrique
+#
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 2 of the License, or (at
+# your option) any later version.
+#
+# This program is distributed in the hope that it will be useful, but
+# WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the GNU
+# General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program; if not, write to the Free Software
+# Foundation, Inc., 51 Franklin Street, Fifth Floor, Boston, MA
+# 02110-1301 USA.
+
+from collections import Counter, OrderedDict
+
+import numpy
+
+from .sparse_permutation import SparsePermutation
+
+# FROM THIS MANY ELEMENTS take() IS FASTER THAN INDEXING, WHICH FIRST CONVERTS A NARROW INDEX TYPE TO intp
+_TAKE_MIN_SIZE = 512
+
+
+def gather(a, p):
+    # a[p] FOR A 1-D a
+    return numpy.take(a, p) if len(p) >= _TAKE_MIN_SIZE else a[p]
+
+
+class CompiledMoves(object):
+    # A MOVE SEQUENCE COMPOSED INTO ONE PERMUTATION, moves IS THE NORMALIZED SEQUENCE
+
+    def __init__(self, moves: str, perm):
+        self.moves = moves
+        self.perm = perm
+        self._sparse = None
+
+    def __len__(self):
+        return len(self.moves.split())
+
+    def __repr__(self):
+        return f'CompiledMoves({self.moves!r})'
+
+    def sparse(self):
+        if self._sparse is None:
+            self._sparse = SparsePermutation.from_dense(self.perm)
+        return self._sparse
+
+    def apply(self, state):
+        # ONE GATHER, ALSO ON A (N, 6nn) BATCH OF STATES
+        if state.ndim == 1:
+            return gather(state, self.perm)
+        return state[..., self.perm]
+
+
+class CompiledMovesCache(object):
+    # LRU OF COMPILED SEQUENCES KEYED BY THE NORMALIZED SEQUENCE, BOUNDED BY THE NUMBER OF SEQUENCES AND THE BYTES OF
+    # THEIR PERMUTATIONS; A NEW SEQUENCE IS COMPOSED FROM THE LONGEST ALREADY COMPILED PREFIX AND SUBSEQUENCES AND
+    # SINGLE MOVES FOR THE REST
+
+    def __init__(self, moves, perm_id, maxsize: int, maxbytes: int):
+        self._moves = moves
+        self._perm_id = perm_id
+        self._maxsize = maxsize
+        self._maxbytes = maxbytes
+        self._nbytes = 0
+        self._compiled = OrderedDict()
+
+        # FIRST TWO MOVES -> LENGTHS OF THE COMPILED SEQUENCES STARTING WITH THEM, SO A NEW SEQUENCE ONLY LOOKS UP THE
+        # SUBSEQUENCES THAT CAN BE THERE
+        self._lengths = {}
+
+        # SEQUENCE AS WRITTEN -> NORMALIZED KEY, AT MOST maxsize OF THEM
+        self._keys = OrderedDict()
+
+    def __len__(self):
+        return len(self._compiled)
+
+    def __contains__(self, key):
+        return key in self._compiled
+
+    def nbytes(self):
+        return self._nbytes
+
+    def clear(self):
+        self._compiled.clear()
+        self._lengths.clear()
+        self._keys.clear()
+        self._nbytes = 0
+
+    def _key(self, moves: str, normalize):
+        # (NORMALIZED KEY, WHETHER moves WAS SEEN BEFORE); A SEQUENCE AS WRITTEN IS NORMALIZED ONLY THE FIRST TIME
+        key = self._keys.get(moves)
+        if key is not None:
+            self._keys.move_to_end(moves)
+            return key, True
+
+        key = ' '.join(normalize(moves))
+        self._keys[moves] = key
+        if len(self._keys) > self._maxsize:
+            self._keys.popitem(last=False)
+        return key, False
+
+    def _get_key(self, key: str):
+        compiled = self._compiled.get(key)
+        if compiled is not None:
+            self._compiled.move_to_end(key)
+            return compiled
+
+        return self.get(key.split())
+
+    def get_moves(self, moves: str, normalize):
+        # A HIT IS TWO DICTIONARY LOOKUPS
+        return self._get_key(self._key(moves, normalize)[0])
+
+    def lookup_moves(self, moves: str, normalize):
+        # (COMPILED, None) IF moves IS CACHED OR WAS SEEN BEFORE, THEN IT IS COMPILED NOW; OTHERWISE (None, NORMALIZED
+        # MOVE LIST), SO A SEQUENCE USED ONLY ONCE IS NEVER COMPOSED
+        key, seen = self._key(moves, normalize)
+        if seen or key in self._compiled:
+            return self._get_key(key), None
+        return None, key.split()
+
+    def get(self, move_list):
+        key = ' '.join(move_list)
+
+        compiled = self._compiled.get(key)
+        if compiled is not None:
+            self._compiled.move_to_end(key)
+            return compiled
+
+        compiled = CompiledMoves(key, self._compose(move_list))
+        compiled.perm.flags.writeable = False
+
+        self._compiled[key] = compiled
+        if len(move_list) > 1:
+            self._lengths.setdefault(tuple(move_list[:2]), Counter())[len(move_list)] += 1
+        self._nbytes += compiled.perm.nbytes
+
+        # THE NEWEST SEQUENCE IS ALWAYS KEPT
+        while len(self._compiled) > 1 and (len(self._compiled) > self._maxsize or self._nbytes > self._maxbytes):
+            _, evicted = self._compiled.popitem(last=False)
+            self._nbytes -= evicted.perm.nbytes
+
+            evicted_list = evicted.moves.split()
+            if len(evicted_list) > 1:
+                start = tuple(evicted_list[:2])
+                self._lengths[start][len(evicted_list)] -= 1
+                if self._lengths[start][len(evicted_list)] == 0:
+                    del self._lengths[start][len(evicted_list)]
+                    if not self._lengths[start]:
+                        del self._lengths[start]
+
+        return compiled
+
+    def _compose(self, move_list):
+        if len(move_list) == 0:
+            return self._perm_id()
+
+        p = None
+        i = 0
+        while i < len(move_list):
+            lengths = self._lengths.get(tuple(move_list[i:i + 2]), ())
+            for k in sorted(lengths, reverse=True) if lengths else ():
+                compiled = self._compiled.get(' '.join(move_list[i:i + k])) if i + k <= len(move_list) else None
+                if compiled is not None:
+                    self._compiled.move_to_end(compiled.moves)
+                    q = compiled.perm
+                    i += k
+                    break
+            else:
+                q = self._moves[move_list[i]]
+                i += 1
+
+            p = q if p is None else gather(p, q)
+
+        return p
@@ -0,0 +1,119 @@
+# Copyright 2021 David Zsolt Manrique
+#
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 2 of the License, or (at
+# your option) any later version.
+#
+# This program is distributed in the hope that it will be useful, but
+# WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the GNU
+# General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program; if not, write to the Free Software
+# Foundation, Inc., 51 Franklin Street, Fifth Floor, Boston, MA
+# 02110-1301 USA.
+
+# DISJOINT CYCLES OF (N, D) PERMUTATIONS IN THE GATHER CONVENTION OF THE PACKAGE (state[p], POSITION x TAKES THE
+# STICKER AT p[x]): THE CYCLE OF x IS x, p[x], p[p[x]], ... AND p APPLIED k TIMES MOVES EVERY POINT k STEPS ALONG IT;
+# ALL PERMUTATIONS OF A BATCH ARE HANDLED TOGETHER, EACH CYCLE IS NAMED BY ITS SMALLEST POINT
+
+import math
+
+import numpy
+
+
+def cycle_labels(perms):
+    # (N, D) SMALLEST POINT OF THE CYCLE OF EVERY POINT AND (N, D) LENGTH OF THAT CYCLE; POINTER DOUBLING, AFTER
+    # ROUND r THE LABEL IS THE MINIMUM OVER THE NEXT 2^r POINTS OF THE CYCLE
+    perms = numpy.atleast_2d(numpy.asarray(perms, dtype=numpy.intp))
+    count, degree = perms.shape
+
+    labels = numpy.minimum(numpy.arange(degree), perms)
+    jump = perms
+    for _ in range(max(degree - 1, 1).bit_length()):
+        numpy.minimum(labels, numpy.take_along_axis(labels, jump, axis=1), out=labels)
+        jump = numpy.take_along_axis(jump, jump, axis=1)
+
+    flat = labels + numpy.arange(count)[:, None] * degree
+    lengths = numpy.bincount(flat.ravel(), minlength=count * degree)[flat]
+    return labels, lengths
+
+
+def _walk_cycles(perms):
+    # EVERY CYCLE OF THE BATCH WALKED FROM ITS SMALLEST POINT: (C, longest) FLAT POINTS, (C,) LENGTHS AND ROWS, AND
+    # THE (N * D) CYCLE AND STEP OF EVERY FLAT POINT
+    perms = numpy.atleast_2d(numpy.asarray(perms, dtype=numpy.intp))
+    count, degree = perms.shape
+    labels, lengths = cycle_labels(perms)
+
+    offsets = numpy.arange(count)[:, None] * degree
+    flat_perm = (perms + offsets).ravel()
+    starts = numpy.flatnonzero(labels.ravel() == numpy.tile(numpy.arange(degree), count))
+    cycle_lengths = lengths.ravel()[starts]
+
+    cycle_of = numpy.empty(count * degree, dtype=numpy.intp)
+    cycle_of[starts] = numpy.arange(len(starts))
+    cycle_of = cycle_of[(labels + offsets).ravel()]
+
+    longest = int(cycle_lengths.max()) if len(starts) else 0
+    points = numpy.zeros((len(starts), longest), dtype=numpy.intp)
+    step = numpy.zeros(count * degree, dtype=numpy.intp)
+
+    active = numpy.arange(len(starts))
+    x = starts.copy()
+    for t in range(longest):
+        points[active, t] = x
+        step[x] = t
+
+        # CYCLES SHORTER THAN THE NEXT STEP ARE DONE
+        more = cycle_lengths[active] > t + 1
+        active, x = active[more], flat_perm[x[more]]
+
+    return points, cycle_lengths, starts // degree, cycle_of, step
+
+
+def cycle_decomposition(perms):
+    # THE CYCLES OF LENGTH 2 OR MORE OF EVERY PERMUTATION: A LIST PER PERMUTATION OF POINT ARRAYS, EACH STARTING WITH
+    # ITS SMALLEST POINT
+    perms = numpy.atleast_2d(numpy.asarray(perms, dtype=numpy.intp))
+    degree = perms.shape[1]
+    points, cycle_lengths, rows, _, _ = _walk_cycles(perms)
+
+    cycles = [[] for _ in range(len(perms))]
+    for c in numpy.flatnonzero(cycle_lengths > 1):
+        cycles[rows[c]].append(points[c, :cycle_lengths[c]] - rows[c] * degree)
+    return cycles
+
+
+def lcm_rows(values):
+    # (N,) LEAST COMMON MULTIPLE OF EVERY ROW OF POSITIVE INTEGERS, OVER ITS DISTINCT VALUES IN PYTHON INTEGERS SO IT
+    # CANNOT OVERFLOW; int64 WHEN ALL OF THEM FIT, OTHERWISE object
+    orders = []
+    for row in numpy.atleast_2d(values):
+        order = 1
+        for value in numpy.unique(row).tolist():
+            order = order * value // math.gcd(order, value)
+        orders.append(order)
+
+    return numpy.array(orders, dtype=numpy.int64 if all(order < 2 ** 63 for order in orders) else object)
+
+
+def perm_orders(perms):
+    # (N,) ORDER OF EVERY PERMUTATION, THE LEAST COMMON MULTIPLE OF ITS CYCLE LENGTHS
+    return lcm_rows(cycle_labels(perms)[1])
+
+
+def power_perms(perms, k: int):
+    # (N, D) PERMUTATIONS APPLIED k TIMES (ANY INTEGER, NEGATIVE FOR THE INVERSE): EVERY POINT MOVES k MODULO ITS
+    # CYCLE LENGTH STEPS ALONG ITS CYCLE
+    perms = numpy.atleast_2d(numpy.asarray(perms, dtype=numpy.intp))
+    count, degree = perms.shape
+    points, cycle_lengths, _, cycle_of, step = _walk_cycles(perms)
+
+    # k IS REDUCED MODULO EVERY CYCLE LENGTH IN PYTHON INTEGERS, SO ANY k WORKS
+    shifts = numpy.array([k % length for length in range(1, points.shape[1] + 1)], dtype=numpy.intp)
+    length = cycle_lengths[cycle_of]
+    powered = points[cycle_of, (step + shifts[length - 1]) % length]
+    return (powered - numpy.repeat(numpy.arange(count) * degree, degree)).reshape(count, degree)
@@ -0,0 +1,154 @@
+# Copyright 2021 David Zsolt Manrique
+#
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 2 of the License, or (at
+# your option) any later version.
+#
+# This program is distributed in the hope that it will be useful, but
+# WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the GNU
+# General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program; if not, write to the Free Software
+# Foundation, Inc., 51 Franklin Street, Fifth Floor, Boston, MA
+# 02110-1301 USA.
+
+# OPT-IN COUNTERS ON THE ENTRY POINTS: CALLS, CUMULATIVE TIME AND, WITH track_memory, THE BYTES ALLOCATED (PEAK OF
+# tracemalloc ABOVE THE START OF THE CALL) PER OPERATION. THE MODULES REGISTER THEIR ENTRY POINTS; enable() REPLACES
+# THEM BY TIMED WRAPPERS AND disable() PUTS THE ORIGINALS BACK, SO THERE IS NO COST WHILE DISABLED. TIMES AND BYTES
+# INCLUDE THE NESTED OPERATIONS (RubikCube.scramble CONTAINS ITS RubikCube.move). NOT THREAD SAFE
+
+import functools
+import time
+
+# tracemalloc IS IMPORTED IN enable(), ONLY WHEN MEMORY IS TRACKED
+
+# (class, method, operation name)
+_ENTRY_POINTS = []
+
+# operation name -> [calls, seconds, bytes, max bytes]
+_COUNTERS = {}
+
+_enabled = False
+_track_memory = False
+_tracemalloc = None
+
+# tracemalloc IS ONLY STOPPED ON disable() IF enable() STARTED IT
+_started_tracing = False
+
+# ONE [traced memory at the start, highest peak seen] PER OPERATION IN PROGRESS, INNERMOST LAST
+_memory_frames = []
+
+
+def register(cls, method: str, name: str = None):
+    # ADD cls.method AS AN ENTRY POINT, WRAPPED AT ONCE IF INSTRUMENTATION IS ENABLED
+    entry = (cls, method, name or f'{cls.__name__}.{method}')
+    _ENTRY_POINTS.append(entry)
+    if _enabled:
+        _wrap(*entry)
+
+
+def _wrap(cls, method: str, name: str):
+    original = cls.__dict__[method]
+
+    @functools.wraps(original)
+    def wrapper(*args, **kwargs):
+        counters = _COUNTERS.setdefault(name, [0, 0.0, 0, 0])
+
+        if _track_memory:
+            current, peak = _tracemalloc.get_traced_memory()
+            # THE PEAK SO FAR BELONGS TO THE ENCLOSING OPERATION BEFORE IT IS RESET FOR THIS ONE
+            if _memory_frames:
+                _memory_frames[-1][1] = max(_memory_frames[-1][1], peak)
+            _tracemalloc.reset_peak()
+            _memory_frames.append([current, current])
+
+        start = time.perf_counter()
+        try:
+            return original(*args, **kwargs)
+        finally:
+            counters[0] += 1
+            counters[1] += time.perf_counter() - start
+
+            if _track_memory:
+                peak = max(_memory_frames[-1][1], _tracemalloc.get_traced_memory()[1])
+                allocated = peak - _memory_frames.pop()[0]
+                counters[2] += allocated
+                counters[3] = max(counters[3], allocated)
+                if _memory_frames:
+                    _memory_frames[-1][1] = max(_memory_frames[-1][1], peak)
+
+    wrapper.__wrapped_original__ = original
+    setattr(cls, method, wrapper)
+
+
+def enable(track_memory: bool = False):
+    global _enabled, _track_memory, _tracemalloc, _started_tracing
+
+    if _enabled:
+        disable()
+
+    _track_memory = track_memory
+    if track_memory:
+        import tracemalloc
+        _tracemalloc = tracemalloc
+        _started_tracing = not tracemalloc.is_tracing()
+        if _started_tracing:
+            tracemalloc.start()
+
+    for entry in _ENTRY_POINTS:
+        _wrap(*entry)
+    _enabled = True
+
+
+def disable():
+    global _enabled, _track_memory, _started_tracing
+
+    for cls, method, _ in _ENTRY_POINTS:
+        wrapper = cls.__dict__.get(method)
+        if wrapper is not None and hasattr(wrapper, '__wrapped_original__'):
+            setattr(cls, method, wrapper.__wrapped_original__)
+
+    if _started_tracing:
+        _tracemalloc.stop()
+        _started_tracing = False
+
+    _enabled = False
+    _track_memory = False
+    del _memory_frames[:]
+
+
+def is_enabled():
+    return _enabled
+
+
+def reset():
+    _COUNTERS.clear()
+
+
+def report():
+    # {operation: {'calls', 'seconds', 'bytes', 'max_bytes'}}, THE BYTES ARE 0 WITHOUT track_memory
+    return {name: {'calls': calls, 'seconds': seconds, 'bytes': allocated, 'max_bytes': max_allocated}
+            for name, (calls, seconds, allocated, max_allocated) in sorted(_COUNTERS.items())}
+
+
+class instrument(object):
+    # with instrument(track_memory=True) as counters: ... ; counters.report() AFTER THE BLOCK
+
+    def __init__(self, track_memory: bool = False):
+        self._track_memory = track_memory
+
+    def __enter__(self):
+        reset()
+        enable(self._track_memory)
+        return self
+
+    def __exit__(self, *exc):
+        disable()
+        return False
+
+    @staticmethod
+    def report():
+        return report()
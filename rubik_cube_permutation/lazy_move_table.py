@@ -0,0 +1,59 @@
+# Copyright 2021 David Zsolt Manrique
+#
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 2 of the License, or (at
+# your option) any later version.
+#
+# This program is distributed in the hope that it will be useful, but
+# WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the GNU
+# General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program; if not, write to the Free Software
+# Foundation, Inc., 51 Franklin Street, Fifth Floor, Boston, MA
+# 02110-1301 USA.
+
+from collections import OrderedDict
+from collections.abc import Mapping
+
+
+class LazyMoveTable(Mapping):
+    # READ-ONLY MOVE NAME -> PERMUTATION MAPPING, A PERMUTATION IS BUILT ON FIRST ACCESS FROM ITS
+    # (axis, first layer, last layer, quarter turns) SPEC AND AT MOST maxsize OF THEM ARE KEPT (LEAST RECENTLY
+    # USED OUT FIRST); MOVES WITH THE SAME SPEC, E.G. U' AND 3D ON THE 3x3x3, SHARE ONE CACHED PERMUTATION
+
+    def __init__(self, specs, build, maxsize: int, cache=None):
+        self._specs = {name: tuple(spec) for name, *spec in specs}
+        self._build = build
+        self._maxsize = maxsize
+        self._cache = OrderedDict() if cache is None else cache
+
+    def __getitem__(self, name):
+        spec = self._specs[name]
+
+        p = self._cache.get(spec)
+        if p is None:
+            p = self._build(*spec)
+            p.flags.writeable = False
+            self._cache[spec] = p
+            if len(self._cache) > self._maxsize:
+                self._cache.popitem(last=False)
+        else:
+            self._cache.move_to_end(spec)
+
+        return p
+
+    def __contains__(self, name):
+        return name in self._specs
+
+    def __iter__(self):
+        return iter(self._specs)
+
+    def __len__(self):
+        return len(self._specs)
+
+    def subset(self, specs):
+        # VIEW ON A SUBSET OF THE MOVES SHARING THE SAME CACHE
+        return LazyMoveTable(specs, self._build, self._maxsize, self._cache)
@@ -0,0 +1,83 @@
+# Copyright 2021 David Zsolt Manrique
+#
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 2 of the License, or (at
+# your option) any later version.
+#
+# This program is distributed in the hope that it will be useful, but
+# WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the GNU
+# General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program; if not, write to the Free Software
+# Foundation, Inc., 51 Franklin Street, Fifth Floor, Boston, MA
+# 02110-1301 USA.
+
+# ON DISK A MOVE TABLE OF AN n x n x n CUBE IS TWO FILES:
+#   moves_<n>.npy  : ALL PERMUTATIONS STACKED INTO ONE (number of moves, 6nn) ARRAY, MEMORY-MAPPED ON LOAD
+#   moves_<n>.json : THE MOVE NAMES OF EACH TABLE (ROTATIONS, OUTER, INNER, BLOCK), ROWS IN THE SAME ORDER
+
+import os
+
+import numpy
+
+# json AND tempfile ARE IMPORTED IN THE FUNCTIONS BELOW, THEY ARE ONLY NEEDED WHEN A CACHE DIRECTORY IS SET
+
+
+def move_table_paths(cache_dir, n: int):
+    return os.path.join(cache_dir, f'moves_{n}.npy'), os.path.join(cache_dir, f'moves_{n}.json')
+
+
+def load_move_tables(cache_dir, n: int, dtype):
+    import json
+
+    npy_path, json_path = move_table_paths(cache_dir, n)
+
+    try:
+        with open(json_path) as f:
+            index = json.load(f)
+        perms = numpy.load(npy_path, mmap_mode='r')
+    except (OSError, ValueError):
+        return None
+
+    if index.get('n') != n or perms.shape != (sum(len(names) for names in index['tables']), 6 * n ** 2):
+        return None
+
+    # TABLES WRITTEN WITH ANOTHER INDEX TYPE ARE REBUILT
+    if perms.dtype != dtype:
+        return None
+
+    perms = perms.view(numpy.ndarray)
+
+    tables = []
+    row = 0
+    for names in index['tables']:
+        tables.append({name: perms[row + i] for i, name in enumerate(names)})
+        row += len(names)
+
+    return tables
+
+
+def save_move_tables(cache_dir, n: int, tables):
+    import json
+    import tempfile
+
+    npy_path, json_path = move_table_paths(cache_dir, n)
+    os.makedirs(cache_dir, exist_ok=True)
+
+    index = {'n': n, 'tables': [list(table.keys()) for table in tables]}
+    perms = numpy.stack([p for table in tables for p in table.values()])
+
+    # WRITE TO TEMPORARY FILES AND RENAME SO CONCURRENT WORKERS NEVER SEE A PARTIAL TABLE
+    fd, tmp_npy = tempfile.mkstemp(dir=cache_dir, suffix='.npy')
+    with os.fdopen(fd, 'wb') as f:
+        numpy.save(f, perms)
+
+    fd, tmp_json = tempfile.mkstemp(dir=cache_dir, suffix='.json')
+    with os.fdopen(fd, 'w') as f:
+        json.dump(index, f)
+
+    os.replace(tmp_npy, npy_path)
+    os.replace(tmp_json, json_path)
@@ -17,9 +17,13 @@
 
 
 import matplotlib.pyplot as plt
-from matplotlib.patches import Rectangle
+from matplotlib import animation
+from matplotlib.colors import to_rgba_array
+from matplotlib.collections import PolyCollection
+from mpl_toolkits.mplot3d.art3d import Poly3DCollection
 import numpy
 
+from . import instrumentation
 from .rubik_cube import RubikCube
 
 
@@ -27,42 +31,65 @@ class MplRubikCube(RubikCube):
     _RGB = ["#ffffff", "#ffd500", "#009b48", "#0046ad", "#b71234", "#ff5800"]
     _COLOR = {'W': 0, 'Y': 1, 'G': 2, 'B': 3, 'R': 4, 'O': 5}  # Western coloring scheme
 
+    _RGBA = to_rgba_array(_RGB)
+
     _EDGE_COLOR = '#111111'
 
-    def __init__(self, n: int):
-        super().__init__(n)
+    def __init__(self, n: int, lazy: bool = False):
+        super().__init__(n, lazy)
 
         self._fontsize = 10 * self._n
 
         self._edge_width = 0.02
         self._edge_line_width = self._edge_width / self._n * 400
 
-    def _y_sq(self, r, c, b):
+        # STICKER GEOMETRY, BUILT ON FIRST RENDER
+        self._quads = None
+        self._squares = None
 
-        return (
-            numpy.array([[r + 0 + self._edge_width, r + 1 - self._edge_width], [r + 0, r + 1 - self._edge_width]]),
-            numpy.array([[b + 0, b + 0], [b + 0, b + 0]]),
-            numpy.array([[c + 0 + self._edge_width, c + 0 + self._edge_width],
-                         [c + 1 - self._edge_width, c + 1 - self._edge_width]]),
-        )
+    def _sq(self, r, c):
+        # (..., 2, 2) GRIDS OF THE TILES AT ROWS r AND COLUMNS c (SCALARS OR ARRAYS), INSET BY THE EDGE WIDTH
+        r = numpy.asarray(r)[..., None, None]
+        c = numpy.asarray(c)[..., None, None]
 
-    def _z_sq(self, r, c, b):
+        return (r + numpy.array([[0 + self._edge_width, 1 - self._edge_width], [0, 1 - self._edge_width]]),
+                c + numpy.array([[0 + self._edge_width, 0 + self._edge_width],
+                                 [1 - self._edge_width, 1 - self._edge_width]]))
 
-        return (
-            numpy.array([[c + 0 + self._edge_width, c + 0 + self._edge_width],
-                         [c + 1 - self._edge_width, c + 1 - self._edge_width]]),
-            numpy.array(
-                [[r + 0 + self._edge_width, r + 1 - self._edge_width], [r + 0, r + 1 - self._edge_width]]),
-            numpy.array([[b + 0, b + 0], [b + 0, b + 0]])
-        )
+    def _y_sq(self, r, c, b):
+        rr, cc = self._sq(r, c)
+        return rr, numpy.full_like(rr, b), cc
+
+    def _z_sq(self, r, c, b):
+        rr, cc = self._sq(r, c)
+        return cc, rr, numpy.full_like(rr, b)
 
     def _x_sq(self, r, c, b):
+        rr, cc = self._sq(r, c)
+        return numpy.full_like(rr, b), cc, rr
+
+    def _quads3d(self):
+        # (6nn, 4, 3) CORNERS OF EVERY STICKER IN STATE ORDER, COMPUTED ONCE FOR ALL FACES
+        if self._quads is None:
+            r, c = numpy.meshgrid(numpy.arange(self._n), numpy.arange(self._n), indexing='ij')
+            r = r.astype(float)
+            c = c.astype(float)
 
-        return (
-            numpy.array([[b + 0, b + 0], [b + 0, b + 0]]),
-            numpy.array([[c + 0 + self._edge_width, c + 0 + self._edge_width],
-                         [c + 1 - self._edge_width, c + 1 - self._edge_width]]),
-            numpy.array([[r + 0 + self._edge_width, r + 1 - self._edge_width], [r + 0, r + 1 - self._edge_width]]))
+            tile_function = [lambda r, c: self._z_sq(self._n - 1 - r, c, self._n),
+                             lambda r, c: self._z_sq(r, c, 0),
+                             lambda r, c: self._y_sq(c, self._n - 1 - r, 0),
+                             lambda r, c: self._y_sq(self._n - 1 - c, self._n - 1 - r, self._n),
+                             lambda r, c: self._x_sq(self._n - 1 - r, c, self._n),
+                             lambda r, c: self._x_sq(self._n - 1 - r, self._n - 1 - c, 0)]
+
+            # SURFACE GRID (2, 2) CORNERS AS A CLOSED POLYGON
+            grid = numpy.stack([numpy.stack(f(r, c), axis=-1) for f in tile_function])
+            self._quads = grid[:, :, :, [0, 0, 1, 1], [0, 1, 1, 0], :].reshape((6 * self._n2, 4, 3))
+
+        return self._quads
+
+    def _face_colors(self, state):
+        return self._RGBA[state]
 
     def _ax3d(self, fig, rectangle, edge_scale=1.0):
 
@@ -79,28 +106,27 @@ class MplRubikCube(RubikCube):
         ax.set_ylim3d(0, self._n)
         ax.set_zlim3d(0, self._n)
 
-        state_6nn = self._state.reshape((6, self._n, self._n))
+        # ALL STICKERS AS ONE COLLECTION
+        ax.add_collection3d(Poly3DCollection(self._quads3d(),
+                                             facecolors=self._face_colors(self._state),
+                                             edgecolors=self._EDGE_COLOR,
+                                             linewidths=self._edge_line_width * edge_scale,
+                                             antialiased=True))
 
-        tile_function = [lambda r, c: self._z_sq(self._n - 1 - r, c, self._n),
-                         lambda r, c: self._z_sq(r, c, 0),
-                         lambda r, c: self._y_sq(c, self._n - 1 - r, 0),
-                         lambda r, c: self._y_sq(self._n - 1 - c, self._n - 1 - r, self._n),
-                         lambda r, c: self._x_sq(self._n - 1 - r, c, self._n),
-                         lambda r, c: self._x_sq(self._n - 1 - r, self._n - 1 - c, 0)]
+        return ax
 
-        for f in range(6):
-            for r in range(self._n):
-                for c in range(self._n):
-                    color = self._RGB[state_6nn[f, r, c]]
+    def _squares2d(self):
+        # (len(_unfolded), 4, 2) CORNERS OF THE NET CELLS IN _unfolded ORDER
+        if self._squares is None:
+            r, c = numpy.nonzero(self._unfolded_grid >= 0)
+            y = self._unfolded_grid.shape[0] - 1 - r
 
-                    ax.plot_surface(*tile_function[f](r, c),
-                                    color=color,
-                                    edgecolor=self._EDGE_COLOR,
-                                    shade=False, alpha=1,
-                                    linewidth=self._edge_line_width * edge_scale,
-                                    antialiased=True)
+            self._squares = numpy.stack([numpy.stack([c, y], axis=-1),
+                                         numpy.stack([c + 1, y], axis=-1),
+                                         numpy.stack([c + 1, y + 1], axis=-1),
+                                         numpy.stack([c, y + 1], axis=-1)], axis=1).astype(float)
 
-        return ax
+        return self._squares
 
     def _ax2d(self, fig, rectangle):
 
@@ -112,16 +138,54 @@ class MplRubikCube(RubikCube):
         ax.set_xlim(0 - d, self._unfolded_grid.shape[1] + d)
         ax.set_ylim(0 - d, self._unfolded_grid.shape[0] + d)
 
-        for r in range(self._unfolded_grid.shape[0]):
-            for c in range(self._unfolded_grid.shape[1]):
-                if self._unfolded_grid[r, c] >= 0:
-                    ax.add_patch(Rectangle((c, self._unfolded_grid.shape[0] - 1 - r), 1, 1,
-                                           linewidth=self._edge_line_width,
-                                           ec=self._EDGE_COLOR,
-                                           fc=self._RGB[self._state[self._unfolded_grid[r, c]]]))
+        # ALL CELLS OF THE NET AS ONE COLLECTION
+        ax.add_collection(PolyCollection(self._squares2d(),
+                                         facecolors=self._face_colors(self._state[self._unfolded]),
+                                         edgecolors=self._EDGE_COLOR,
+                                         linewidths=self._edge_line_width))
 
         return ax
 
+    def net_images(self, states, cell_size: int = 1):
+        # RGBA IMAGES OF THE NETS OF ONE STATE OR AN (N, 6nn) BATCH, cell_size PIXELS PER STICKER WITH A ONE PIXEL
+        # EDGE WHEN cell_size > 2, EMPTY CELLS TRANSPARENT
+        states = numpy.asarray(states)
+        empty = self._unfolded_grid < 0
+
+        images = self._RGBA[states[..., numpy.where(empty, 0, self._unfolded_grid)]]
+        images[..., empty, :] = 0
+
+        if cell_size > 1:
+            images = images.repeat(cell_size, axis=-3).repeat(cell_size, axis=-2)
+            if cell_size > 2:
+                # EDGE ON THE TOP AND LEFT OF EVERY CELL, ON THE BOTTOM AND RIGHT WHERE NO CELL FOLLOWS
+                i = numpy.arange(empty.shape[0] * cell_size)[:, None]
+                j = numpy.arange(empty.shape[1] * cell_size)[None, :]
+                no_cell = numpy.pad(empty, ((0, 1), (0, 1)), constant_values=True)
+
+                border = (i % cell_size == 0) | (j % cell_size == 0)
+                border |= (i % cell_size == cell_size - 1) & no_cell[i // cell_size + 1, j // cell_size]
+                border |= (j % cell_size == cell_size - 1) & no_cell[i // cell_size, j // cell_size + 1]
+                border &= ~no_cell[i // cell_size, j // cell_size]
+
+                images[..., border, :] = to_rgba_array(self._EDGE_COLOR)[0]
+
+        return images
+
+    def net_mosaic(self, states, columns: int = 8, cell_size: int = 1, padding: int = 1):
+        # ONE RGBA IMAGE WITH THE NETS OF AN (N, 6nn) BATCH ON A GRID OF columns COLUMNS
+        images = self.net_images(numpy.atleast_2d(states), cell_size)
+        count, height, width = images.shape[:3]
+        rows = (count + columns - 1) // columns
+        pad = padding * cell_size
+
+        mosaic = numpy.zeros((rows, height + pad, columns, width + pad, 4))
+        cells = numpy.zeros((rows * columns, height, width, 4))
+        cells[:count] = images
+        mosaic[:, :height, :, :width] = cells.reshape((rows, columns, height, width, 4)).transpose((0, 2, 1, 3, 4))
+
+        return mosaic.reshape((rows * (height + pad), columns * (width + pad), 4))
+
     def view3d(self):
         fig = plt.figure(figsize=(4, 4))
         self._ax3d(fig, (0, 0, 1, 1))
@@ -132,12 +196,85 @@ class MplRubikCube(RubikCube):
         self._ax2d(fig, (0, 0, 1, 1))
         return fig
 
+    def view2d_batch(self, states, columns: int = 8, cell_size: int = 8):
+        mosaic = self.net_mosaic(states, columns, cell_size)
+        fig = plt.figure(figsize=(4 * mosaic.shape[1] / mosaic.shape[0], 4))
+        ax = fig.add_axes((0, 0, 1, 1), frameon=False)
+        ax.set_xticks([])
+        ax.set_yticks([])
+        ax.imshow(mosaic, interpolation='nearest')
+        return fig
+
     def view(self):
         fig = plt.figure(figsize=(4, 3))
         self._ax2d(fig, (0, 0, 1, 1))
         self._ax3d(fig, (0.75 - 0.3 / 2, 0.015 + 0.15 - 0.25 / 2, 0.3, 0.25), 0.3)
         return fig
 
+    def _frame_writer(self, path: str, fps: int):
+        if path.endswith('.gif'):
+            return animation.PillowWriter(fps=fps)
+        if path.endswith('.mp4'):
+            if not animation.FFMpegWriter.isAvailable():
+                raise RuntimeError('Writing .mp4 needs ffmpeg, use .gif or a .png frame pattern instead')
+            return animation.FFMpegWriter(fps=fps)
+        if path.endswith('.png'):
+            # ONE FILE PER FRAME, path IS A FORMAT PATTERN SUCH AS 'frames/step_{:04d}.png'
+            if path.format(0) == path.format(1):
+                raise ValueError(f'The frames would overwrite each other, {path} needs a frame number such as '
+                                 f'step_{{:04d}}.png')
+            return None
+
+        raise ValueError(f'Unsupported animation file {path}, use .gif, .mp4 or .png')
+
+    def animate(self, moves: str, path: str, fps: int = 4, dpi: int = 100, move=False):
+        # ONE FRAME FOR THE CURRENT STATE AND ONE AFTER EACH MOVE; THE ARTISTS OF view() ARE BUILT ONCE AND ONLY THE
+        # FACE COLORS OF THE STICKERS A MOVE CHANGES ARE UPDATED
+        writer = self._frame_writer(path, fps)
+        state = self._state.copy()
+
+        fig = self.view()
+        net, cube = fig.axes[0].collections[0], fig.axes[1].collections[0]
+        title = fig.text(0.02, 0.96, '', va='top', fontsize=8)
+
+        net_colors = self._face_colors(state[self._unfolded])
+        cube_colors = self._face_colors(state)
+        net_position = numpy.argsort(self._unfolded)
+
+        def frames():
+            yield ''
+            for m in moves.strip().split():
+                sp = self.sparse_move(m)
+                sp.apply(state)
+                changed = sp.support()
+
+                cube_colors[changed] = self._RGBA[state[changed]]
+                net_colors[net_position[changed]] = self._RGBA[state[changed]]
+                cube.set_facecolor(cube_colors)
+                net.set_facecolor(net_colors)
+                yield m
+
+        try:
+            if writer is None:
+                for i, m in enumerate(frames()):
+                    title.set_text(m)
+                    fig.savefig(path.format(i), dpi=dpi)
+            else:
+                with writer.saving(fig, path, dpi):
+                    for m in frames():
+                        title.set_text(m)
+                        writer.grab_frame()
+        finally:
+            plt.close(fig)
+
+        if move:
+            self._state = state
+
+        return self
+
+
+instrumentation.register(MplRubikCube, 'view')
+
 
 if __name__ == "__main__":
     c = MplRubikCube(2)
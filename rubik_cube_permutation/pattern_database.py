@@ -0,0 +1,141 @@
+# Copyright 2021 David Zsolt Manrique
+#
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 2 of the License, or (at
+# your option) any later version.
+#
+# This program is distributed in the hope that it will be useful, but
+# WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the GNU
+# General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program; if not, write to the Free Software
+# Foundation, Inc., 51 Franklin Street, Fifth Floor, Boston, MA
+# 02110-1301 USA.
+
+# PIECES OF ONE KIND (CORNERS WITH 3 ORIENTATIONS, EDGES WITH 2) ARE TRACKED BY THEIR LOCATION slot * k + orientation,
+# slot COUNTED OVER THE SLOTS THE MOVES REACH; A PATTERN DATABASE IS THE uint8 DISTANCE TO THE SOLVED STATE OF EVERY
+# PLACEMENT OF A SUBSET OF THE PIECES, RANKED DENSELY, STORED ON DISK AS pdb_<n>_<name>.npy AND MEMORY-MAPPED ON LOAD
+
+import os
+
+import numpy
+
+# tempfile IS IMPORTED IN save_pattern_database, ONLY WHEN A CACHE DIRECTORY IS SET
+
+UNREACHED = 255
+
+
+def piece_move_tables(pieces, perms):
+    # FOR THE (P, k) STICKERS OF THE PIECES OF ONE KIND AND (M, 6nn) MOVE PERMUTATIONS: THE PIECES THE MOVES REACH AND
+    # THE (M, len(reached) * k) NEW LOCATION OF A PIECE AT EVERY LOCATION AFTER EVERY MOVE
+    pieces = numpy.asarray(pieces)
+    perms = numpy.asarray(perms)
+    count, k = pieces.shape
+
+    piece_of = numpy.zeros(perms.shape[1], dtype=int)
+    orientation_of = numpy.zeros(perms.shape[1], dtype=int)
+    piece_of[pieces] = numpy.arange(count)[:, None]
+    orientation_of[pieces] = numpy.arange(k)
+
+    # AFTER A MOVE, SLOT s HOLDS THE PIECE OF SLOT source[s], TURNED BY twist[s]
+    first = perms[:, pieces[:, 0]]
+    source, twist = piece_of[first], orientation_of[first]
+
+    reached = numpy.flatnonzero((source != numpy.arange(count)).any(axis=0) | (twist != 0).any(axis=0))
+    index = numpy.full(count, -1)
+    index[reached] = numpy.arange(len(reached))
+
+    tables = numpy.empty((len(perms), len(reached) * k), dtype=numpy.int8)
+    for m in range(len(perms)):
+        for s in reached:
+            for o in range(k):
+                tables[m, index[source[m, s]] * k + o] = index[s] * k + (o + twist[m, s]) % k
+
+    return reached, tables
+
+
+def pattern_size(slots: int, tracked: int, k: int, drop_last: bool = False):
+    size = 1
+    for i in range(tracked):
+        size *= slots - i
+    return size * k ** (tracked - drop_last)
+
+
+def rank_locations(locations, slots: int, k: int, drop_last: bool = False):
+    # DENSE RANKS OF (N, t) LOCATIONS OF t DISTINCT PIECES: THE ORDERED CHOICE OF SLOTS, THEN THE ORIENTATIONS; WHEN
+    # EVERY PIECE IS TRACKED AND THE ORIENTATIONS ADD UP TO 0 MODULO k, drop_last LEAVES THE LAST ONE OUT
+    locations = numpy.ascontiguousarray(numpy.asarray(locations, dtype=numpy.int8).T)
+    slot, orientation = locations // k, locations % k
+    tracked = len(slot)
+
+    rank = numpy.zeros(slot.shape[1], dtype=numpy.int64)
+    for i in range(tracked):
+        smaller = numpy.zeros(slot.shape[1], dtype=numpy.int8)
+        for j in range(i):
+            smaller += slot[j] < slot[i]
+        rank *= slots - i
+        rank += slot[i] - smaller
+    for i in range(tracked - drop_last):
+        rank *= k
+        rank += orientation[i]
+
+    return rank
+
+
+def build_pattern_database(tables, home, slots: int, k: int, drop_last: bool = False, chunk_size: int = 65536):
+    # BREADTH-FIRST SEARCH FROM THE home LOCATIONS OF THE TRACKED PIECES UNDER THE (M, slots * k) LOCATION TABLES
+    home = numpy.asarray(home, dtype=numpy.int8)
+    table = numpy.full(pattern_size(slots, len(home), k, drop_last), UNREACHED, dtype=numpy.uint8)
+
+    frontier = home[None]
+    table[rank_locations(frontier, slots, k, drop_last)] = 0
+    depth = 0
+    while len(frontier):
+        depth += 1
+
+        reached = []
+        for start in range(0, len(frontier), chunk_size):
+            locations = tables[:, frontier[start:start + chunk_size]].reshape(-1, len(home))
+            ranks = rank_locations(locations, slots, k, drop_last)
+
+            new = table[ranks] == UNREACHED
+            ranks, index = numpy.unique(ranks[new], return_index=True)
+            table[ranks] = depth
+            reached.append(locations[new][index])
+
+        frontier = numpy.concatenate(reached)
+
+    return table
+
+
+def pattern_database_path(cache_dir, n: int, name: str):
+    return os.path.join(cache_dir, f'pdb_{n}_{name}.npy')
+
+
+def load_pattern_database(cache_dir, n: int, name: str, size: int):
+    try:
+        table = numpy.load(pattern_database_path(cache_dir, n, name), mmap_mode='r')
+    except (OSError, ValueError):
+        return None
+
+    # TABLES OF ANOTHER SHAPE OR TYPE ARE REBUILT
+    if table.shape != (size,) or table.dtype != numpy.uint8:
+        return None
+
+    return table.view(numpy.ndarray)
+
+
+def save_pattern_database(cache_dir, n: int, name: str, table):
+    import tempfile
+
+    os.makedirs(cache_dir, exist_ok=True)
+
+    # WRITE TO A TEMPORARY FILE AND RENAME SO CONCURRENT SOLVERS NEVER SEE A PARTIAL TABLE
+    fd, tmp_npy = tempfile.mkstemp(dir=cache_dir, suffix='.npy')
+    with os.fdopen(fd, 'wb') as f:
+        numpy.save(f, table)
+
+    os.replace(tmp_npy, pattern_database_path(cache_dir, n, name))
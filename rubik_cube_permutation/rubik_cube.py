@@ -16,6 +16,9 @@
 # 02110-1301 USA.
 
 import numpy
+from . import instrumentation
+from .bidirectional_search import bidirectional_search
+from .compiled_moves import CompiledMoves, gather
 from .rubik_cube_permutation import RubikCubePermutation
 
 
@@ -23,11 +26,14 @@ class RubikCube(RubikCubePermutation):
     _COLOR = {'W': 0, 'Y': 1, 'G': 2, 'B': 3, 'R': 4, 'O': 5} # Western coloring scheme
     _INVERSE_COLOR = ['W', 'Y', 'G', 'B', 'R', 'O']
 
-    def __init__(self, n: int):
-        super().__init__(n)
+    def __init__(self, n: int, lazy: bool = False):
+        super().__init__(n, lazy)
 
         self._state = self.initial_state()
 
+        # MOVE NAME -> ITS SPARSE FORM, OR None IF IT TURNS TOO MANY STICKERS FOR AN IN-PLACE UPDATE TO PAY OFF
+        self._in_place_moves = {}
+
     def get_scrambler_moves(self, n: int, seed: int):
         move_list = sorted(list(self._outer_layer_moves.keys()) + list(self._outer_block_moves.keys()))
         random = numpy.random.RandomState(seed)
@@ -41,78 +47,167 @@ class RubikCube(RubikCubePermutation):
         self.move(self.get_scrambler_moves(n, seed))
         return self
 
-    def move(self, moves: str):
-        p = self.perm_moves(moves)
-        self._state = self._state[p]
+    def _in_place_move(self, move: str):
+        # THE SPARSE FORM OF A MOVE THAT TURNS AT MOST A QUARTER OF THE STICKERS (SLICES, AND FACE TURNS FROM n = 10),
+        # WHERE UPDATING THEM IN PLACE IS FASTER THAN A GATHER OF THE WHOLE STATE; None FOR OTHER MOVES
+        if move not in self._in_place_moves:
+            if self._move_spec is None:
+                self._build_move_spec_index()
+
+            _, lo, hi, _ = self._move_spec[move]
+            moved = 4 * self._n * (hi - lo + 1) + self._n2 * ((lo == 0) + (hi == self._n - 1))
+            self._in_place_moves[move] = self.sparse_move(move) if 4 * moved <= 6 * self._n2 else None
+
+        return self._in_place_moves[move]
+
+    def move(self, moves):
+        # A SEQUENCE OF SEVERAL MOVES THAT IS CACHED OR SEEN BEFORE IS COMPOSED ONCE AND APPLIED AS ONE GATHER; A SINGLE
+        # MOVE OR A NEW SEQUENCE IS APPLIED MOVE BY MOVE, IN PLACE ON THE MOVED STICKERS WHERE THAT IS FASTER
+        if isinstance(moves, CompiledMoves):
+            compiled, move_list = moves, None
+        else:
+            compiled, move_list = self._compiled.lookup_moves(moves, self.normalize_moves)
+
+        if compiled is not None:
+            if len(compiled) != 1:
+                self._state = compiled.apply(self._state)
+                return self
+            move_list = [compiled.moves]
+
+        for move in move_list:
+            sp = self._in_place_move(move)
+            if sp is None:
+                self._state = gather(self._state, self._moves[move])
+            else:
+                sp.apply(self._state)
         return self
 
-    def print_state(self):
-
-        for r in range(self._unfolded_grid.shape[0]):
-            for c in range(self._unfolded_grid.shape[1]):
-                if self._unfolded_grid[r, c] < 0:
-                    print(f' {" ":{self._field_width}s} ', end='')
-                else:
-                    print(f' {self._INVERSE_COLOR[self._state[self._unfolded_grid[r, c]]]:>{self._field_width}s} ',
-                          end='')
-
-            print()
-        print()
-
+    def find_moves(self, target, moves=None, state=None, max_depth: int = 10, chunk_size: int = 65536):
+        # SHORTEST SEQUENCE OF moves (ALL MOVES EXCEPT ROTATIONS BY DEFAULT) THAT TAKES state (THE CURRENT STATE BY
+        # DEFAULT) TO target, SEARCHED FROM BOTH ENDS; None IF THERE IS NONE OF AT MOST max_depth MOVES
+        state = self._state if state is None else numpy.asarray(state)
+        if self._move_spec is None:
+            self._build_move_spec_index()
+
+        if moves is None:
+            moves = [m for table in [self._outer_layer_moves, self._inner_layer_moves, self._outer_block_moves]
+                     for m in table]
+
+        # MOVES WITH THE SAME PERMUTATION ARE KEPT ONCE, THE TARGET SIDE TURNS THE SAME LAYERS BACK
+        unique = {}
+        for move in moves:
+            unique.setdefault(self.perm_moves(move).tobytes(), move)
+        moves = list(unique.values())
+
+        inverse_moves = []
+        for move in moves:
+            a, lo, hi, t = self._move_spec[move]
+            inverse_moves.append(self._spec_move[(a, lo, hi, (4 - t) % 4)])
+
+        path = bidirectional_search(state, target, self.perm_table(moves), self.perm_table(inverse_moves), max_depth,
+                                    chunk_size)
+        return None if path is None else ' '.join(moves[m] for m in path)
+
+    def _color_cells(self):
+        return numpy.array([f' {c:>{self._field_width}s} ' for c in self._INVERSE_COLOR], dtype=object)
+
+    def format_state(self, state=None):
+        state = self._state if state is None else state
+        return '\n'.join(self._net_rows(self._color_cells()[state])) + '\n\n'
+
+    def print_state(self, file=None):
+        print(self.format_state(), end='', file=file)
         return self
 
-    def print_move(self, moves: str, steps=False, move=False):
-
+    def format_move(self, moves: str, steps=False):
+        # THE NETS BEFORE AND AFTER moves, OR AFTER EACH MOVE WITH steps, AND THE FINAL STATE
         move_steps = [moves]
         state = self._state.copy()
+        cells = self._color_cells()
 
         if steps:
             move_steps = [op.strip() for op in moves.split()]
 
+        lines = []
         for move in move_steps:
 
-            p = self.perm_moves(move)
+            p = self.compile_moves(move).perm
             next_state = state[p]
 
-            print(move)
-            for r in range(self._unfolded_grid.shape[0]):
-                for c in range(self._unfolded_grid.shape[1]):
-                    if self._unfolded_grid[r, c] < 0:
-                        print(f' {" ":{self._field_width}s} ', end='')
-                    else:
-                        print(f' {self._INVERSE_COLOR[state[self._unfolded_grid[r, c]]]:>{self._field_width}s} ',
-                              end='')
-
-                # if r == self._unfolded_grid.shape[0] // 2:
-                print(f'    ==>   ', end='')
-                # else:
-                #    print(f'   {" ":{self._field_width}s}   ', end='')
-
-                for c in range(self._unfolded_grid.shape[1]):
-                    if self._unfolded_grid[r, c] < 0:
-                        print(f' {" ":{self._field_width}s} ', end='')
-                    else:
-                        print(f' {self._INVERSE_COLOR[next_state[self._unfolded_grid[r, c]]]:>{self._field_width}s} ',
-                              end='')
-
-                print()
+            lines.append(move)
+            lines += [a + '    ==>   ' + b for a, b in zip(self._net_rows(cells[state]), self._net_rows(cells[next_state]))]
+            lines.append('')
+
             state = next_state
-            print()
+
+        return '\n'.join(lines) + '\n', state
+
+    def print_move(self, moves: str, steps=False, move=False, file=None):
+        text, state = self.format_move(moves, steps)
+        print(text, end='', file=file)
 
         if move:
             self._state = state
 
         return self
 
-    def set_state_from_print(self, text: str):
-        unfolded_state = [self._COLOR[color] for color in text.replace(' ', '').replace('\n', '')]
+    # COMPACT FORMAT: ONE STATE PER LINE, THE 6nn COLOR LETTERS IN STATE ORDER
+
+    def format_state_lines(self, states):
+        states = numpy.atleast_2d(states)
+        letters = numpy.frombuffer(''.join(self._INVERSE_COLOR).encode('ascii'), dtype=numpy.uint8)
+
+        text = numpy.full((states.shape[0], states.shape[1] + 1), ord('\n'), dtype=numpy.uint8)
+        text[:, :-1] = letters[states]
+        return text.tobytes().decode('ascii')
+
+    def _color_codes(self, text: str):
+        # COLOR OF EVERY CHARACTER OF text, 6 FOR WHITESPACE
+        codes = numpy.full(256, 255, dtype=numpy.uint8)
+        codes[[ord(c) for c in ' \t\r\n']] = 6
+        for c, i in self._COLOR.items():
+            codes[ord(c)] = i
 
-        for i, k in enumerate(self._unfolded):
-            self._state[k] = unfolded_state[i]
+        codes = codes[numpy.frombuffer(text.encode('ascii'), dtype=numpy.uint8)]
+        if (codes == 255).any():
+            raise ValueError(f'Unexpected character in state text, expected whitespace and {"".join(self._COLOR)}')
 
+        return codes
+
+    def parse_state_lines(self, text: str):
+        colors = self._color_codes(text)
+        colors = colors[colors < 6]
+
+        if len(colors) % (6 * self._n2) != 0:
+            raise ValueError(f'Expected lines of {6 * self._n2} colors')
+
+        return colors.reshape((-1, 6 * self._n2))
+
+    def parse_states(self, text: str):
+        # ANY NUMBER OF PRINTED NETS (print_state OUTPUT), LINES STARTING WITH # ARE IGNORED
+        if '#' in text:
+            text = '\n'.join(line for line in text.splitlines() if not line.lstrip().startswith('#'))
+
+        colors = self._color_codes(text)
+        colors = colors[colors < 6]
+
+        if len(colors) % (6 * self._n2) != 0:
+            raise ValueError(f'Expected nets of {6 * self._n2} colors')
+
+        states = numpy.empty((len(colors) // (6 * self._n2), 6 * self._n2), dtype=self._STATE_DTYPE)
+        states[:, self._unfolded] = colors.reshape((-1, 6 * self._n2))
+        return states
+
+    def set_state_from_print(self, text: str):
+        self._state[:] = self.parse_states(text)[0]
         return self
 
 
+for _method in ['move', 'scramble', 'format_state', 'format_move']:
+    instrumentation.register(RubikCube, _method)
+del _method
+
+
 if __name__ == "__main__":
     c = RubikCube(2)
 
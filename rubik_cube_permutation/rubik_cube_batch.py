@@ -0,0 +1,104 @@
+# Copyright 2021 David Zsolt Manrique
+#
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 2 of the License, or (at
+# your option) any later version.
+#
+# This program is distributed in the hope that it will be useful, but
+# WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the GNU
+# General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program; if not, write to the Free Software
+# Foundation, Inc., 51 Franklin Street, Fifth Floor, Boston, MA
+# 02110-1301 USA.
+
+import numpy
+from .rubik_cube_permutation import RubikCubePermutation
+
+
+class RubikCubeBatch(RubikCubePermutation):
+
+    def __init__(self, n: int, size: int, lazy: bool = False):
+        super().__init__(n, lazy)
+
+        # BATCH OF size CUBES AS ONE (size, 6nn) STATE ARRAY
+        self._size = size
+        self._states = self.initial_states()
+
+        self._scrambler_moves = sorted(list(self._outer_layer_moves.keys()) + list(self._outer_block_moves.keys()))
+        self._scrambler_table = None
+
+    def __len__(self):
+        return self._size
+
+    def initial_states(self):
+        return numpy.tile(self.initial_state(), (self._size, 1))
+
+    def get_states(self):
+        return self._states
+
+    def set_states(self, states):
+        states = numpy.asarray(states)
+        if states.shape != (self._size, 6 * self._n2):
+            raise ValueError(f'Expected states of shape {(self._size, 6 * self._n2)}, got {states.shape}')
+
+        self._states = states.astype(self._STATE_DTYPE)
+        return self
+
+    def reset(self):
+        self._states = self.initial_states()
+        return self
+
+    def permute(self, p):
+        p = numpy.asarray(p)
+
+        if p.ndim == 1:
+            self._states = self._states[:, p]
+        else:
+            self._states = numpy.take_along_axis(self._states, p, axis=1)
+
+        return self
+
+    def move(self, moves):
+        if isinstance(moves, str):
+            return self.permute(self.compile_moves(moves).perm)
+
+        if len(moves) != self._size:
+            raise ValueError(f'Expected {self._size} move sequences, got {len(moves)}')
+
+        return self.permute(numpy.stack([self.compile_moves(m).perm for m in moves]))
+
+    def get_scrambler_indices(self, n: int, seed: int):
+        random = numpy.random.RandomState(seed)
+        return random.randint(0, len(self._scrambler_moves), size=(self._size, n))
+
+    def get_scrambler_moves(self, n: int, seed: int):
+        move_list = numpy.asarray(self._scrambler_moves)
+        return [' '.join(row) for row in move_list[self.get_scrambler_indices(n, seed)]]
+
+    def scramble(self, n: int, seed: int):
+        if self._scrambler_table is None:
+            self._scrambler_table = self.perm_table(self._scrambler_moves)
+
+        indices = self.get_scrambler_indices(n, seed)
+        for i in range(n):
+            self.permute(self._scrambler_table[indices[:, i]])
+
+        return self
+
+    def is_solved(self):
+        return self.is_state_solved(self._states)
+
+    def is_ldb_normalized(self):
+        return self.is_state_ldb_normalized(self._states)
+
+
+if __name__ == "__main__":
+    b = RubikCubeBatch(3, 5)
+
+    print(b.get_scrambler_moves(4, 0))
+    print(b.scramble(4, 0).is_solved())
+    print(b.reset().move(['U', 'U U\'', 'R', 'R R R R', 'F2']).is_solved())
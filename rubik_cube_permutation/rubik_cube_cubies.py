@@ -0,0 +1,208 @@
+# Copyright 2021 David Zsolt Manrique
+#
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 2 of the License, or (at
+# your option) any later version.
+#
+# This program is distributed in the hope that it will be useful, but
+# WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the GNU
+# General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program; if not, write to the Free Software
+# Foundation, Inc., 51 Franklin Street, Fifth Floor, Boston, MA
+# 02110-1301 USA.
+
+# CUBIE STATES: ONE VALUE PER CUBIE SLOT INSTEAD OF ONE COLOR PER STICKER, piece * k + orientation WHERE k IS THE
+# NUMBER OF STICKERS OF THE PIECE AND SLOT STICKER j SHOWS PIECE STICKER (j + orientation) % k; THE SLOTS OF ALL KINDS
+# (CORNERS, MIDDLE EDGES, WINGS, CENTERS) ARE CONCATENATED INTO ONE ROW. A MOVE IS A GATHER OF THE SLOTS AND A TWIST
+# PER SLOT, DERIVED FROM ITS STICKER PERMUTATION
+
+import numpy
+
+from .compiled_moves import CompiledMoves
+from .rubik_cube_permutation import RubikCubePermutation
+
+
+class RubikCubeCubies(RubikCubePermutation):
+
+    def __init__(self, n: int, lazy: bool = False):
+        if n < 2:
+            raise ValueError('Cubie states need a cube of at least 2x2x2')
+
+        super().__init__(n, lazy)
+
+        # EVERY KIND: (name, (count, k) STICKERS OF THE SLOTS, FIRST COLUMN)
+        self._kinds = []
+        column = 0
+        for name, stickers in self._cubie_stickers():
+            if len(stickers):
+                self._kinds.append((name, stickers, column))
+                column += len(stickers)
+        self._size = column
+
+        self._column_k = numpy.concatenate([numpy.full(len(s), s.shape[1]) for _, s, _ in self._kinds])
+        # piece * k + orientation IS BELOW count * k FOR EVERY KIND, ONE BYTE PER SLOT UP TO THE 8x8x8
+        largest = max(len(s) * s.shape[1] for _, s, _ in self._kinds)
+        self._cubie_dtype = numpy.uint8 if largest <= 2 ** 8 else self.index_dtype(largest)
+        self._solved_cubies = numpy.concatenate([numpy.arange(len(s)) * s.shape[1] for _, s, _ in self._kinds]).astype(
+            self._cubie_dtype)
+
+        self._color_tables = None
+
+    def _cubie_stickers(self):
+        # THE STICKERS OF A CUBIE SHARE THEIR LAYERS ALONG ALL THREE AXES; TWO-STICKER CUBIES START WITH THE STICKER OF
+        # THE LOWEST AXIS (U / D, THEN F / B) LIKE edge_stickers(), CORNERS GO CLOCKWISE LIKE corner_stickers()
+        layers = self.sticker_layers()
+        axis = self._face_idx // 2
+        key = (layers[:, 0] * self._n + layers[:, 1]) * self._n + layers[:, 2]
+
+        order = numpy.lexsort((axis, key))
+        _, first, counts = numpy.unique(key[order], return_index=True, return_counts=True)
+
+        pairs = numpy.stack([order[first[counts == 2]], order[first[counts == 2] + 1]], axis=1)
+        middle = (layers[pairs[:, 0]] == self._n // 2).any(axis=1) & (self._n % 2 == 1)
+
+        return [('corners', self.corner_stickers().astype(int)),
+                ('edges', self.edge_stickers().astype(int) if self._n % 2 == 1 else numpy.zeros((0, 2), dtype=int)),
+                ('wings', pairs[~middle]),
+                ('centers', order[first[counts == 1]][:, None])]
+
+    def piece_kinds(self):
+        # (name, number of slots, stickers per piece, first column) OF EVERY KIND OF CUBIE IN THE STATE ROW
+        return [(name, len(stickers), stickers.shape[1], column) for name, stickers, column in self._kinds]
+
+    def cubie_size(self):
+        return self._size
+
+    def initial_cubies(self):
+        return self._solved_cubies.copy()
+
+    def is_cubies_solved(self, cubies):
+        return (numpy.asarray(cubies) == self._solved_cubies).all(axis=-1)
+
+    # MOVES
+
+    def cubie_move(self, moves):
+        # (GATHER, TWIST) OF A MOVE SEQUENCE, A CompiledMoves OR A STICKER PERMUTATION: SLOT s RECEIVES THE PIECE OF
+        # SLOT gather[s], TURNED BY twist[s]
+        if isinstance(moves, str):
+            moves = self.compile_moves(moves).perm
+        elif isinstance(moves, CompiledMoves):
+            moves = moves.perm
+        p = numpy.asarray(moves)
+
+        gather = numpy.empty(self._size, dtype=numpy.intp)
+        twist = numpy.empty(self._size, dtype=self._cubie_dtype)
+        for _, stickers, column in self._kinds:
+            count, k = stickers.shape
+            slot_of = numpy.zeros(6 * self._n2, dtype=numpy.intp)
+            index_of = numpy.zeros(6 * self._n2, dtype=numpy.intp)
+            slot_of[stickers] = numpy.arange(count)[:, None]
+            index_of[stickers] = numpy.arange(k)
+
+            first = p[stickers[:, 0]]
+            gather[column:column + count] = column + slot_of[first]
+            twist[column:column + count] = index_of[first]
+
+        return gather, twist
+
+    def cubie_move_table(self, moves):
+        # STACKED (len(moves), cubie_size()) GATHERS AND TWISTS, ROW i FOR moves[i]
+        gathers, twists = zip(*[self.cubie_move(move) for move in moves])
+        return numpy.stack(gathers), numpy.stack(twists)
+
+    def move_cubies(self, cubies, moves):
+        # ONE CUBIE STATE OR AN (N, cubie_size()) BATCH AFTER moves
+        gather, twist = moves if isinstance(moves, tuple) else self.cubie_move(moves)
+        cubies = numpy.asarray(cubies)[..., gather]
+        orientation = cubies % self._column_k
+        return (cubies - orientation + (orientation + twist) % self._column_k).astype(self._cubie_dtype)
+
+    # CONVERSION
+
+    def _build_color_tables(self):
+        # FOR EVERY KIND: THE COLORS OF EVERY VALUE, THE SHIFT OF A PIECE FOR THE COLORS OF A SLOT (BASE 6 DIGITS, -1
+        # IF THE PIECE DOES NOT HAVE THEM) AND THE PIECES OF EVERY COLOR SET; PIECES OF THE SAME COLORS (WINGS AND
+        # CENTERS OF LARGER CUBES) ARE INTERCHANGEABLE
+        self._color_tables = []
+        for _, stickers, _ in self._kinds:
+            count, k = stickers.shape
+            solved = self._face_idx[stickers].astype(int)
+            weights = 6 ** numpy.arange(k - 1, -1, -1)
+
+            colors = numpy.stack([numpy.roll(solved, -shift, axis=1) for shift in range(k)], axis=1).reshape(-1, k)
+
+            shift_of = numpy.full((count, 6 ** k), -1, dtype=numpy.intp)
+            for shift in range(k):
+                shift_of[numpy.arange(count), numpy.roll(solved, -shift, axis=1) @ weights] = shift
+
+            color_set = numpy.sort(solved, axis=1) @ weights
+            sets, set_of_piece, set_counts = numpy.unique(color_set, return_inverse=True, return_counts=True)
+            members = numpy.full((len(sets), set_counts.max()), -1, dtype=numpy.intp)
+            for s in range(len(sets)):
+                found = numpy.flatnonzero(set_of_piece == s)
+                members[s, :len(found)] = found
+
+            set_lookup = numpy.full(6 ** k, -1, dtype=numpy.intp)
+            set_lookup[sets] = numpy.arange(len(sets))
+
+            self._color_tables.append((colors.astype(self._STATE_DTYPE), weights, shift_of, set_lookup, members))
+
+    def to_stickers(self, cubies):
+        # STICKER STATES OF ONE CUBIE STATE OR AN (N, cubie_size()) BATCH
+        if self._color_tables is None:
+            self._build_color_tables()
+
+        cubies = numpy.asarray(cubies)
+        states = numpy.empty(cubies.shape[:-1] + (6 * self._n2,), dtype=self._STATE_DTYPE)
+        for (_, stickers, column), (colors, _, _, _, _) in zip(self._kinds, self._color_tables):
+            states[..., stickers] = colors[cubies[..., column:column + len(stickers)]]
+        return states
+
+    def to_cubies(self, states):
+        # CUBIE STATES OF ONE STICKER STATE OR AN (N, 6nn) BATCH, to_stickers() GIVES BACK THE SAME COLORS; PIECES OF
+        # THE SAME COLORS ARE NUMBERED IN SLOT ORDER. STATES WITH PIECES THAT DO NOT EXIST RAISE A ValueError
+        if self._color_tables is None:
+            self._build_color_tables()
+
+        states = numpy.asarray(states)
+        batch = numpy.atleast_2d(states).astype(int)
+        cubies = numpy.empty((len(batch), self._size), dtype=self._cubie_dtype)
+        for (name, stickers, column), (_, weights, shift_of, set_lookup, members) in zip(self._kinds,
+                                                                                         self._color_tables):
+            count, k = stickers.shape
+            codes = batch[:, stickers] @ weights
+            sets = set_lookup[numpy.sort(batch[:, stickers], axis=2) @ weights]
+
+            # THE i-TH SLOT (IN SLOT ORDER) WITH A COLOR SET GETS THE i-TH PIECE OF THAT SET
+            order = numpy.argsort(sets, axis=1, kind='stable')
+            sorted_sets = numpy.take_along_axis(sets, order, axis=1)
+            run_start = numpy.zeros(sorted_sets.shape, dtype=numpy.intp)
+            new_run = numpy.ones(sorted_sets.shape, dtype=bool)
+            new_run[:, 1:] = sorted_sets[:, 1:] != sorted_sets[:, :-1]
+            run_start[new_run] = numpy.flatnonzero(new_run.ravel()) % count
+            run_start = numpy.maximum.accumulate(run_start, axis=1)
+            rank = numpy.empty_like(order)
+            numpy.put_along_axis(rank, order, numpy.arange(count) - run_start, axis=1)
+
+            valid = (sets >= 0) & (rank < members.shape[1])
+            piece = numpy.where(valid, members[numpy.maximum(sets, 0), numpy.minimum(rank, members.shape[1] - 1)], 0)
+            shift = shift_of[piece, codes]
+            if not (valid & (piece >= 0) & (shift >= 0)).all():
+                raise ValueError(f'The {name} of the state are not valid')
+
+            cubies[:, column:column + count] = piece * k + shift
+
+        return cubies if states.ndim == 2 else cubies[0]
+
+
+if __name__ == "__main__":
+    c = RubikCubeCubies(3)
+    print(c.piece_kinds(), c.cubie_size())
+
+    cubies = c.move_cubies(c.initial_cubies(), "R U R' U'")
+    print(cubies)
+    print((c.to_stickers(cubies) == c.initial_state()[c.perm_moves("R U R' U'")]).all())
@@ -0,0 +1,253 @@
+# Copyright 2021 David Zsolt Manrique
+#
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 2 of the License, or (at
+# your option) any later version.
+#
+# This program is distributed in the hope that it will be useful, but
+# WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the GNU
+# General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program; if not, write to the Free Software
+# Foundation, Inc., 51 Franklin Street, Fifth Floor, Boston, MA
+# 02110-1301 USA.
+
+# BREADTH-FIRST SEARCH OF THE CAYLEY GRAPH OF THE CUBE UNDER A SET OF MOVES, STARTING FROM THE SOLVED STATE:
+#   n = 2 WITHOUT ROTATIONS : EVERY STATE HAS A DENSE RANK (CORNER PERMUTATION x CORNER TWIST), THE VISITED AND
+#                             FRONTIER SETS ARE BITSETS OVER THE RANKS AND MOVES ARE LOOKUPS IN COORDINATE TABLES
+#   OTHERWISE               : STATES ARE KEPT AS ARRAYS AND THE VISITED SET AS SORTED 64-BIT STATE HASHES
+
+from itertools import permutations
+from math import factorial
+
+import numpy
+
+from .rubik_cube_permutation import RubikCubePermutation
+from .state_encoding import hash_states
+
+# THE CORNER THAT NO MOVE OF THIS PACKAGE TURNS (DLB), THE OTHER SEVEN CORNERS ARE RANKED
+_FIXED_CORNER = 7
+_CORNERS = 7
+_TWISTS = 3 ** (_CORNERS - 1)
+
+# NUMBER OF SET BITS OF EVERY BYTE
+_POPCOUNT = numpy.unpackbits(numpy.arange(256, dtype=numpy.uint8)[:, None], axis=1).sum(axis=1)
+
+
+def _rank_corner_perms(cp):
+    # LEXICOGRAPHIC RANK OF (N, 7) PERMUTATIONS OF 0..6
+    rank = numpy.zeros(len(cp), dtype=numpy.int32)
+    for i in range(_CORNERS - 1):
+        smaller = (cp[:, i + 1:] < cp[:, i:i + 1]).sum(axis=1)
+        rank += smaller * factorial(_CORNERS - 1 - i)
+    return rank
+
+
+def _rank_corner_twists(co):
+    # BASE 3 RANK OF (N, 7) TWISTS, THE LAST TWIST FOLLOWS FROM THE OTHERS (THE SUM IS 0 MODULO 3)
+    return co[:, :-1] @ (3 ** numpy.arange(_CORNERS - 1))
+
+
+def _set_bits(bits, ranks):
+    numpy.bitwise_or.at(bits, ranks >> 3, (1 << (ranks & 7)).astype(numpy.uint8))
+
+
+def _get_bits(bits, ranks):
+    return (bits[ranks >> 3] >> (ranks & 7)) & 1 == 1
+
+
+def _bit_indices(bits, start: int, stop: int):
+    # SORTED RANKS OF THE SET BITS IN BYTES start..stop OF THE BITSET
+    return (numpy.flatnonzero(numpy.unpackbits(bits[start:stop], bitorder='little')) + 8 * start).astype(numpy.int32)
+
+
+def _bit_count(bits):
+    return int(_POPCOUNT[bits].sum())
+
+
+def _sorted_unique(keys):
+    # ORDER THAT SORTS keys, THE SORTED KEYS AND THE MASK OF THE FIRST OF EVERY RUN OF EQUAL KEYS
+    order = numpy.argsort(keys)
+    keys = keys[order]
+    first = numpy.ones(len(keys), dtype=bool)
+    first[1:] = keys[1:] != keys[:-1]
+    return order, keys, first
+
+
+def _contains(sorted_keys, keys):
+    pos = numpy.minimum(numpy.searchsorted(sorted_keys, keys), len(sorted_keys) - 1)
+    return sorted_keys[pos] == keys
+
+
+class RubikCubeGraph(RubikCubePermutation):
+
+    def __init__(self, n: int, moves=None, lazy: bool = False):
+        super().__init__(n, lazy)
+
+        # GENERATORS, ALL MOVES EXCEPT ROTATIONS BY DEFAULT; MOVES WITH THE SAME PERMUTATION ARE KEPT ONCE
+        if moves is None:
+            moves = [m for table in [self._outer_layer_moves, self._inner_layer_moves, self._outer_block_moves]
+                     for m in table]
+
+        self._generators = {}
+        for move in moves:
+            self._generators.setdefault(self.perm_moves(move).tobytes(), move)
+        self._generators = list(self._generators.values())
+        self._generator_table = self.perm_table(self._generators)
+
+        self._corners = self.corner_stickers() if n >= 2 else None
+        self._dense = n == 2 and (self._generator_table[:, self._corners[_FIXED_CORNER]] ==
+                                  self._corners[_FIXED_CORNER]).all()
+
+        if self._dense:
+            self._build_coordinate_tables()
+
+    def generators(self):
+        return list(self._generators)
+
+    def is_dense(self):
+        return self._dense
+
+    def size(self):
+        # NUMBER OF RANKS OF THE DENSE 2x2x2 COORDINATE
+        return factorial(_CORNERS) * _TWISTS
+
+    # 2x2x2 CORNER COORDINATES
+
+    def _corner_pieces(self, p):
+        # (N, 8) CORNER AND TWIST AT EVERY CORNER POSITION OF THE (N, 6nn) PERMUTATIONS p, READ FROM THE FIRST
+        # STICKER OF THE POSITION
+        corner_of = numpy.zeros(6 * self._n2, dtype=numpy.int8)
+        twist_of = numpy.zeros(6 * self._n2, dtype=numpy.int8)
+        corner_of[self._corners] = numpy.arange(8)[:, None]
+        twist_of[self._corners] = numpy.arange(3)
+
+        sticker = numpy.asarray(p)[:, self._corners[:, 0]]
+        return corner_of[sticker], twist_of[sticker]
+
+    def _build_coordinate_tables(self):
+        # FOR A MOVE m, POSITION s RECEIVES THE CORNER AT mp[s], TWISTED BY mo[s]
+        mp, mo = self._corner_pieces(self._generator_table)
+        mp, mo = mp[:, :_CORNERS], mo[:, :_CORNERS]
+
+        cp = numpy.array(list(permutations(range(_CORNERS))), dtype=numpy.int8)
+        co = numpy.indices((3,) * (_CORNERS - 1), dtype=numpy.int8).reshape(_CORNERS - 1, -1)[::-1].T
+        co = numpy.hstack([co, (-co.sum(axis=1, keepdims=True)) % 3]).astype(numpy.int8)
+
+        self._cp_table = numpy.stack([_rank_corner_perms(cp[:, p]) for p in mp]).astype(numpy.int32)
+        self._co_table = numpy.stack([_rank_corner_twists((co[:, p] + t) % 3) for p, t in zip(mp, mo)]).astype(
+            numpy.int32)
+
+        self._cp_states = cp
+        self._co_states = co
+
+        # A CORNER IS IDENTIFIED BY ITS COLORS, ITS TWIST BY THE POSITION OF ITS U OR D COLOR: 3 * corner + twist
+        # FOR EVERY COLOR TRIPLE 36 * a + 6 * b + c
+        solved = self._face_idx[self._corners].astype(int)
+        self._color_pieces = numpy.full(6 ** 3, -1, dtype=numpy.int16)
+        for t in range(3):
+            self._color_pieces[numpy.roll(solved, -t, axis=1) @ [36, 6, 1]] = numpy.arange(8) * 3 + t
+
+    def rank_states(self, states):
+        # DENSE RANKS OF (N, 24) 2x2x2 STATES, THE SOLVED STATE IS 0
+        states = numpy.atleast_2d(states)
+
+        piece = self._color_pieces[states[:, self._corners].astype(int) @ [36, 6, 1]]
+        cp, co = piece[:, :_CORNERS] // 3, piece[:, :_CORNERS] % 3
+        return _rank_corner_perms(cp) * _TWISTS + _rank_corner_twists(co)
+
+    def unrank_states(self, ranks):
+        # (N, 24) 2x2x2 STATES OF DENSE RANKS
+        cp, co = numpy.divmod(numpy.asarray(ranks), _TWISTS)
+        cp, co = self._cp_states[cp], self._co_states[co]
+
+        p = numpy.tile(self.perm_id(), (len(cp), 1))
+        for s in range(_CORNERS):
+            for j in range(3):
+                p[:, self._corners[s, j]] = self._corners[cp[:, s], (j + co[:, s]) % 3]
+
+        return self._face_idx[p]
+
+    def neighbours(self, ranks):
+        # (number of generators, N) RANKS ONE MOVE AWAY FROM THE DENSE RANKS
+        cp, co = numpy.divmod(numpy.asarray(ranks), _TWISTS)
+        return self._cp_table[:, cp] * _TWISTS + self._co_table[:, co]
+
+    # SEARCH
+
+    def _bfs_dense(self, depths: bool, chunk_size: int):
+        # THE VISITED, FRONTIER AND NEXT FRONTIER SETS ARE BITSETS OF size() BITS, THE FRONTIER IS EXPANDED chunk_size
+        # RANKS AT A TIME; THE BITSETS ALSO DROP THE DUPLICATES
+        size = self.size()
+        visited = numpy.zeros((size + 7) // 8, dtype=numpy.uint8)
+        table = numpy.full(size, 255, dtype=numpy.uint8) if depths else None
+
+        frontier = visited.copy()
+        _set_bits(frontier, numpy.zeros(1, dtype=numpy.int32))
+        visited |= frontier
+
+        counts = []
+        while frontier.any():
+            counts.append(_bit_count(frontier))
+
+            reached = numpy.zeros_like(visited)
+            for start in range(0, len(frontier), chunk_size // 8):
+                ranks = _bit_indices(frontier, start, start + chunk_size // 8)
+                if depths:
+                    table[ranks] = len(counts) - 1
+
+                ranks = self.neighbours(ranks).ravel()
+                _set_bits(reached, ranks[~_get_bits(visited, ranks)])
+
+            visited |= reached
+            frontier = reached
+
+        return (counts, table) if depths else counts
+
+    def _bfs_states(self, chunk_size: int):
+        # chunk_size STATES OF THE FRONTIER ARE EXPANDED AT A TIME
+        frontier = self.initial_state()[None]
+        visited = hash_states(frontier)
+        generators = self._generator_table.ravel()
+        counts = []
+        while len(frontier):
+            counts.append(len(frontier))
+
+            reached = []
+            reached_keys = []
+            for start in range(0, len(frontier), chunk_size):
+                states = numpy.take(frontier[start:start + chunk_size], generators, axis=1).reshape(-1, 6 * self._n2)
+                order, keys, first = _sorted_unique(hash_states(states))
+                new = first & ~_contains(visited, keys)
+                reached.append(states[order[new]])
+                reached_keys.append(keys[new])
+
+            order, keys, first = _sorted_unique(numpy.concatenate(reached_keys))
+            frontier = numpy.concatenate(reached)[order[first]]
+
+            # THE NEW KEYS ARE SORTED AND NOT VISITED YET, THEY ARE MERGED IN PLACE OF A FULL SORT
+            visited = numpy.insert(visited, numpy.searchsorted(visited, keys[first]), keys[first])
+
+        return counts
+
+    def bfs(self, depths: bool = False, chunk_size: int = 65536):
+        # NUMBER OF STATES AT EACH DISTANCE FROM THE SOLVED STATE; WITH depths ALSO THE (size(),) uint8 DISTANCE OF
+        # EVERY DENSE RANK (255 IF UNREACHABLE), n = 2 ONLY
+        if self._dense:
+            return self._bfs_dense(depths, chunk_size)
+
+        if depths:
+            raise ValueError('Distance tables need the dense 2x2x2 coordinates')
+
+        return self._bfs_states(chunk_size)
+
+
+if __name__ == "__main__":
+    g = RubikCubeGraph(2)
+    print(g.generators())
+    print(g.bfs())
+
+    print(RubikCubeGraph(3, ['U', 'U2', 'R2']).bfs())
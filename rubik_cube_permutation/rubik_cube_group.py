@@ -0,0 +1,144 @@
+# Copyright 2021 David Zsolt Manrique
+#
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 2 of the License, or (at
+# your option) any later version.
+#
+# This program is distributed in the hope that it will be useful, but
+# WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the GNU
+# General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program; if not, write to the Free Software
+# Foundation, Inc., 51 Franklin Street, Fifth Floor, Boston, MA
+# 02110-1301 USA.
+
+# THE PERMUTATION GROUP OF THE STICKERS GENERATED BY A SET OF MOVES, REPRESENTED BY ITS STABILIZER CHAIN: GROUP ORDER,
+# MEMBERSHIP OF PERMUTATIONS AND STATES AND UNIFORM RANDOM REACHABLE STATES. A STATE OF A CUBE UP TO 3x3x3 DETERMINES
+# ITS PERMUTATION (EVERY PIECE HAS ITS OWN COLORS), SO ITS MEMBERSHIP IS THE MEMBERSHIP OF THAT PERMUTATION
+
+import numpy
+
+from .rubik_cube_permutation import RubikCubePermutation
+from .schreier_sims import group_order, random_perms, schreier_sims, sift_perms
+
+
+class RubikCubeGroup(RubikCubePermutation):
+
+    # STABILIZER CHAINS ARE SHARED BY EVERY GROUP OF THE SAME SIZE AND GENERATORS
+    _STABILIZER_CHAINS = {}
+
+    def __init__(self, n: int, moves=None, lazy: bool = False):
+        super().__init__(n, lazy)
+
+        # GENERATORS, ALL MOVES EXCEPT ROTATIONS BY DEFAULT; MOVES WITH THE SAME PERMUTATION ARE KEPT ONCE
+        if moves is None:
+            moves = [m for table in [self._outer_layer_moves, self._inner_layer_moves, self._outer_block_moves]
+                     for m in table]
+
+        self._generators = {}
+        for move in moves:
+            self._generators.setdefault(self.perm_moves(move).tobytes(), move)
+
+        key = (n, tuple(sorted(self._generators)))
+        self._generators = list(self._generators.values())
+        if key not in self._STABILIZER_CHAINS:
+            self._STABILIZER_CHAINS[key] = schreier_sims(self.perm_table(self._generators), 6 * self._n2)
+        self._chain = self._STABILIZER_CHAINS[key]
+
+        self._pieces = None
+
+    def generators(self):
+        return list(self._generators)
+
+    def base(self):
+        return self._chain[0].copy()
+
+    def orbit_lengths(self):
+        return [len(orbit) for orbit in self._chain[1]]
+
+    def order(self):
+        # EXACT NUMBER OF ELEMENTS OF THE GROUP, A PYTHON INTEGER
+        return group_order(self._chain)
+
+    def contains_perms(self, perms):
+        # MEMBERSHIP OF ONE PERMUTATION OR AN (N, 6nn) BATCH: A BOOLEAN OR AN (N,) BOOLEAN ARRAY
+        perms = numpy.asarray(perms)
+        member = sift_perms(self._chain, perms)
+        return member if perms.ndim == 2 else bool(member[0])
+
+    # STATES
+
+    def _piece_kinds(self):
+        # (STICKERS, LOOKUP) OF EVERY KIND OF PIECE; THE LOOKUP GIVES k * piece + shift FOR THE COLORS OF A SLOT (BASE 6
+        # DIGITS), OR -1
+        if self._pieces is None:
+            centers = numpy.arange(6)[:, None] * self._n2 + self._n2 // 2
+            stickers = [centers] if self._n % 2 == 1 else []
+            if self._n >= 2:
+                stickers.append(self.corner_stickers().astype(int))
+            if self._n == 3:
+                stickers.append(self.edge_stickers().astype(int))
+
+            self._pieces = []
+            for s in stickers:
+                count, k = s.shape
+                solved = self._face_idx[s].astype(int)
+                lookup = numpy.full(6 ** k, -1)
+                for shift in range(k):
+                    lookup[numpy.roll(solved, -shift, axis=1) @ 6 ** numpy.arange(k - 1, -1, -1)] = (
+                        numpy.arange(count) * k + shift)
+                self._pieces.append((s, lookup))
+
+        return self._pieces
+
+    def state_perms(self, states):
+        # (N, 6nn) PERMUTATIONS p WITH initial_state()[p] == states AND AN (N,) MASK OF THE STATES WHERE EVERY PIECE IS
+        # FOUND ONCE; n <= 3 ONLY, LARGER CUBES HAVE PIECES OF THE SAME COLORS
+        if self._n > 3:
+            raise ValueError('States determine their permutation up to the 3x3x3 only')
+
+        states = numpy.atleast_2d(numpy.asarray(states)).astype(int)
+        perms = numpy.zeros(states.shape, dtype=numpy.intp)
+        valid = numpy.ones(len(states), dtype=bool)
+        rows = numpy.arange(len(states))[:, None, None]
+
+        for stickers, lookup in self._piece_kinds():
+            count, k = stickers.shape
+            found = lookup[states[:, stickers] @ 6 ** numpy.arange(k - 1, -1, -1)]
+            piece, shift = found // k, found % k
+
+            valid &= (found >= 0).all(axis=1)
+            valid &= (numpy.sort(piece, axis=1) == numpy.arange(count)).all(axis=1)
+
+            # SLOT s HOLDS PIECE q TURNED BY shift: ITS j-th STICKER COMES FROM STICKER (j + shift) % k OF q
+            j = (numpy.arange(k) + shift[..., None]) % k
+            perms[rows, stickers] = stickers[numpy.maximum(piece, 0)[..., None], j]
+
+        return perms, valid
+
+    def contains_states(self, states):
+        # WHETHER THE MOVES REACH ONE STATE OR AN (N, 6nn) BATCH FROM THE SOLVED STATE: A TWISTED CORNER, A FLIPPED
+        # EDGE, AN ODD PERMUTATION OR A PIECE OF IMPOSSIBLE COLORS ALL FAIL
+        states = numpy.asarray(states)
+        perms, valid = self.state_perms(states)
+        member = valid & sift_perms(self._chain, perms)
+        return member if states.ndim == 2 else bool(member[0])
+
+    def random_states(self, count: int, seed=None):
+        # (count, 6nn) UNIFORM RANDOM STATES REACHABLE WITH THE MOVES
+        random = numpy.random.RandomState(seed)
+        return self._face_idx[random_perms(self._chain, 6 * self._n2, count, random)]
+
+
+if __name__ == "__main__":
+    g = RubikCubeGroup(3, ['U', 'F', 'R'])
+    print(g.order(), g.orbit_lengths())
+
+    state = g.random_states(1, seed=0)[0]
+    twisted = state.copy()
+    corner = g.corner_stickers()[0]
+    twisted[corner] = twisted[numpy.roll(corner, 1)]
+    print(g.contains_states(state), g.contains_states(twisted))
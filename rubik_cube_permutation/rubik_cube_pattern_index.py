@@ -0,0 +1,164 @@
+# Copyright 2021 David Zsolt Manrique
+#
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 2 of the License, or (at
+# your option) any later version.
+#
+# This program is distributed in the hope that it will be useful, but
+# WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the GNU
+# General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program; if not, write to the Free Software
+# Foundation, Inc., 51 Franklin Street, Fifth Floor, Boston, MA
+# 02110-1301 USA.
+
+# RECOGNITION OF CASES (OLL / PLL STYLE): A CASE IS AN ALGORITHM THAT SOLVES THE MASKED STICKERS, A STATE MATCHES IT
+# WHEN pre algorithm post SOLVES THEM FOR SOME PRE-MOVE (A U TURN, ALSO AFTER A WHOLE-CUBE ROTATION) AND POST-MOVE. THE
+# STATE AFTER A SEQUENCE p IS state[p], SO EVERY VARIANT IS THE CONDITION state[p[mask]] == goal[mask]: A SET OF
+# POSITIONS AND THEIR COLORS. VARIANTS OVER THE SAME POSITIONS ARE LOOKED UP BY THE HASH OF THE PACKED COLORS AT THOSE
+# POSITIONS, ONE HASH PER STATE AND GROUP
+
+import numpy
+
+from .rubik_cube_permutation import RubikCubePermutation
+from .state_encoding import hash_states
+
+
+class RubikCubePatternIndex(RubikCubePermutation):
+
+    _AUF = ['', 'U', 'U2', 'U\'']
+
+    def __init__(self, n: int, mask, colors=None, pre_moves=None, post_moves=None, rotations: bool = False,
+                 lazy: bool = False):
+        # mask: THE STICKERS A CASE SOLVES (BOOLEAN MASK OR INDICES); colors: AN OPTIONAL (6,) RELABELLING OF THE
+        # COLORS BEFORE THEY ARE COMPARED, E.G. ONLY THE U COLOR MATTERS FOR ORIENTATION CASES; pre_moves AND
+        # post_moves ARE THE U TURNS BY DEFAULT, rotations ALSO RECOGNIZES THE CASES IN ALL 24 ORIENTATIONS
+        super().__init__(n, lazy)
+
+        self._mask = self.sticker_mask(mask).astype(numpy.intp)
+        self._colors = numpy.arange(6, dtype=self._STATE_DTYPE) if colors is None else numpy.asarray(
+            colors, dtype=self._STATE_DTYPE)
+        self._goal = self._colors[self._face_idx[self._mask]]
+
+        self._pre_moves = list(self._AUF if pre_moves is None else pre_moves)
+        self._post_moves = list(self._AUF if post_moves is None else post_moves)
+        if rotations:
+            self._pre_moves = [self.simplify_moves(f'{r} {m}') for r in self.rotation_group()[1]
+                               for m in self._pre_moves]
+
+        self._cases = []
+        self._groups = None
+
+    def add_case(self, name: str, algorithm: str):
+        self._cases.append((name, algorithm))
+        self._groups = None
+        return len(self._cases) - 1
+
+    def add_cases(self, cases):
+        # A DICTIONARY OR (name, algorithm) PAIRS
+        for name, algorithm in (cases.items() if isinstance(cases, dict) else cases):
+            self.add_case(name, algorithm)
+        return self
+
+    def cases(self):
+        return list(self._cases)
+
+    def _build(self):
+        # EVERY VARIANT: (case, pre-move, post-move), ITS SORTED POSITIONS AND THE COLORS THERE; GROUPS OF VARIANTS
+        # WITH THE SAME POSITIONS KEEP THE SORTED HASHES OF THEIR COLORS
+        self._variants = []
+        positions = {}
+        for c, (_, algorithm) in enumerate(self._cases):
+            for a, pre in enumerate(self._pre_moves):
+                for b, post in enumerate(self._post_moves):
+                    p = self.compile_moves(f'{pre} {algorithm} {post}').perm[self._mask]
+                    order = numpy.argsort(p)
+                    positions.setdefault(p[order].tobytes(), (p[order], []))[1].append(
+                        (len(self._variants), self._goal[order]))
+                    self._variants.append((c, a, b))
+
+        self._groups = []
+        for idx, variants in positions.values():
+            ids = numpy.array([v for v, _ in variants])
+            goals = numpy.stack([g for _, g in variants])
+
+            # THE FIRST VARIANT AMONG EQUAL KEYS IS THE FIRST ADDED CASE WITH THE FIRST PRE AND POST-MOVES
+            keys = hash_states(goals)
+            order = numpy.argsort(keys, kind='stable')
+            self._groups.append((idx, keys[order], ids[order], goals[order]))
+
+    def _match_hash(self, states, found):
+        for idx, keys, ids, goals in self._groups:
+            rows = numpy.flatnonzero(found < 0)
+            if len(rows) == 0:
+                break
+
+            colors = self._colors[states[rows][:, idx]]
+            state_keys = hash_states(colors)
+
+            pos = numpy.minimum(numpy.searchsorted(keys, state_keys), len(keys) - 1)
+
+            # THE HASH ONLY SELECTS THE VARIANT, THE COLORS CONFIRM IT
+            hit = (keys[pos] == state_keys) & (goals[pos] == colors).all(axis=1)
+            found[rows[hit]] = ids[pos[hit]]
+
+    def _match_compare(self, states, found):
+        for idx, _, ids, goals in self._groups:
+            rows = numpy.flatnonzero(found < 0)
+            if len(rows) == 0:
+                break
+
+            match = (self._colors[states[rows][:, idx]][:, None, :] == goals).all(axis=2)
+
+            # THE GOALS ARE SORTED BY HASH, THE SMALLEST VARIANT INDEX AMONG THE MATCHES IS THE ONE THE HASH LOOKUP GIVES
+            variant = numpy.where(match, ids, len(self._variants)).min(axis=1)
+            hit = variant < len(self._variants)
+            found[rows[hit]] = variant[hit]
+
+    def match(self, states, method: str = 'hash', chunk_size: int = 65536):
+        # FOR ONE STATE OR AN (N, 6nn) BATCH: THE INDEX OF THE MATCHING CASE (-1 IF NONE) AND THE SEQUENCE pre
+        # algorithm post THAT SOLVES THE MASKED STICKERS (None IF NONE); method 'hash' LOOKS THE VARIANTS UP BY THE
+        # HASH OF THE MASKED STATE, 'compare' COMPARES THE STATE WITH EVERY VARIANT
+        if method not in ('hash', 'compare'):
+            raise ValueError(f'Unknown match method {method!r}, expected \'hash\' or \'compare\'')
+
+        if self._groups is None:
+            self._build()
+
+        batch = numpy.atleast_2d(numpy.asarray(states))
+        found = numpy.full(len(batch), -1)
+        for start in range(0, len(batch), chunk_size):
+            chunk_found = found[start:start + chunk_size]
+            if self._groups:
+                (self._match_hash if method == 'hash' else self._match_compare)(batch[start:start + chunk_size],
+                                                                                chunk_found)
+
+        # ONE SEQUENCE PER MATCHED VARIANT, SHARED BY ALL ROWS THAT MATCHED IT
+        cases = numpy.full(len(batch), -1)
+        algorithms = numpy.full(len(batch), None, dtype=object)
+        for v in numpy.unique(found[found >= 0]):
+            c, a, b = self._variants[v]
+            rows = found == v
+            cases[rows] = c
+            algorithms[rows] = self.simplify_moves(f'{self._pre_moves[a]} {self._cases[c][1]} {self._post_moves[b]}')
+        algorithms = algorithms.tolist()
+
+        if numpy.ndim(states) == 1:
+            return int(cases[0]), algorithms[0]
+        return cases, algorithms
+
+
+if __name__ == "__main__":
+    top_layer = RubikCubePermutation(3).sticker_layers()[:, 0] == 0
+    index = RubikCubePatternIndex(3, top_layer)
+    index.add_cases({'T': "R U R' U' R' F R2 U' R' U' R U R' F'",
+                     'Ua': "R U' R U R U R U' R' U' R2",
+                     'H': "R2 U2 R U2 R2 U2 R2 U2 R U2 R2"})
+
+    state = index.initial_state()[numpy.argsort(index.perm_moves("U R U R' U' R' F R2 U' R' U' R U R' F' U2"))]
+    case, algorithm = index.match(state)
+    print(index.cases()[case][0], algorithm, index.is_state_stickers_solved(state[index.perm_moves(algorithm)],
+                                                                            top_layer))
@@ -17,23 +17,68 @@
 
 # https://en.wikipedia.org/wiki/Rubik%27s_family_cubes_of_all_sizes
 
+import os
+
 import numpy
 
+from . import instrumentation
+from .compiled_moves import CompiledMoves, CompiledMovesCache
+from .cycle_structure import cycle_decomposition, cycle_labels, lcm_rows, perm_orders, power_perms
+from .lazy_move_table import LazyMoveTable
+from .move_table_cache import load_move_tables, save_move_tables
+from .sparse_permutation import SparsePermutation
+from .state_encoding import hash_states, pack_states, unpack_states
+
 
 class RubikCubePermutation(object):
     _FACE = {'U': 0, 'D': 1, 'F': 2, 'B': 3, 'R': 4, 'L': 5}
     _INVERSE_FACE = ['U', 'D', 'F', 'B', 'R', 'L']
 
-    def __init__(self, n: int):
+    # MOVE TABLES ARE SHARED BY EVERY INSTANCE OF THE SAME SIZE AND OPTIONALLY PERSISTED ON DISK
+    _MOVE_TABLES = {}
+    _cache_dir = os.environ.get('RUBIK_CUBE_PERMUTATION_CACHE')
+
+    # NUMBER OF PERMUTATIONS KEPT IN MEMORY IN LAZY MODE
+    _LAZY_CACHE_SIZE = 64
+
+    # NUMBER OF COMPILED MOVE SEQUENCES KEPT BY EACH INSTANCE AND THE BYTES OF THEIR PERMUTATIONS, LESS IN LAZY MODE
+    _COMPILED_CACHE_SIZE = 1024
+    _COMPILED_CACHE_BYTES = 16 * 2 ** 20
+    _LAZY_COMPILED_CACHE_BYTES = 2 ** 20
+
+    # STICKER COLORS ARE 0..5
+    _STATE_DTYPE = numpy.uint8
+
+    # MOVE NAME SUFFIX AND NUMBER OF QUARTER TURNS
+    _POWERS = [('', 1), ('2', 2), ('\'', 3)]
+
+    # PLACE VALUES OF 21 STICKERS OF 3 BITS IN A 64-BIT WORD, FIRST STICKER MOST SIGNIFICANT
+    _LEX_POWERS = numpy.uint64(8) ** numpy.arange(20, -1, -1, dtype=numpy.uint64)
+
+    # NAMES OF THE STICKER KINDS OF sticker_kinds()
+    _STICKER_KINDS = ['corners', 'edges', 'centers']
+
+    @classmethod
+    def set_cache_dir(cls, cache_dir):
+        cls._cache_dir = cache_dir
+
+    @staticmethod
+    def index_dtype(size: int):
+        return numpy.uint16 if size <= 2 ** 16 else numpy.uint32
+
+    def __init__(self, n: int, lazy: bool = False):
 
         # CUBE of n x n x n
         self._n = n
         self._n2 = self._n ** 2
 
+        # SMALLEST INDEX TYPE FOR STATE INDICES AND PERMUTATIONS
+        self._index_dtype = self.index_dtype(6 * self._n2)
+
         # TWO KINDS OF STATE : FACE STATE AND FLATTENED STATE
-        self._idx = numpy.array(range(6 * self._n ** 2), dtype=int)
+        self._idx = numpy.arange(6 * self._n ** 2, dtype=self._index_dtype)
         self._idx_6nn = self._idx.copy().reshape((6, self._n, self._n))
-        self._face_idx = self._idx // self._n ** 2
+        self._face_idx = (self._idx // self._n ** 2).astype(self._STATE_DTYPE)
         self._face_idx_6nn = self._face_idx.copy().reshape((6, self._n, self._n))
 
         # INDEX WIDTH FOR PRINTING
@@ -42,95 +87,153 @@ class RubikCubePermutation(object):
         # GRID FOR PRINTING
         unfolded_grid = numpy.full((3 * self._n, 4 * self._n), -1, dtype=int)
 
-        for r in range(self._n):
-            for c in range(self._n):
-                unfolded_grid[r, c + self._n] = self._idx_6nn[0, r, c]
-                unfolded_grid[r + self._n, c + self._n] = self._idx_6nn[2, r, c]
-                unfolded_grid[r + 2 * self._n, c + self._n] = self._idx_6nn[1, r, c]
-                unfolded_grid[r + self._n, c] = self._idx_6nn[5, r, c]
-                unfolded_grid[r + self._n, c + 2 * self._n] = self._idx_6nn[4, r, c]
-                unfolded_grid[r + self._n, c + 3 * self._n] = self._idx_6nn[3, r, c]
+        n = self._n
+        unfolded_grid[0:n, n:2 * n] = self._idx_6nn[0]
+        unfolded_grid[n:2 * n, n:2 * n] = self._idx_6nn[2]
+        unfolded_grid[2 * n:3 * n, n:2 * n] = self._idx_6nn[1]
+        unfolded_grid[n:2 * n, 0:n] = self._idx_6nn[5]
+        unfolded_grid[n:2 * n, 2 * n:3 * n] = self._idx_6nn[4]
+        unfolded_grid[n:2 * n, 3 * n:4 * n] = self._idx_6nn[3]
 
         self._unfolded_grid = unfolded_grid
 
-        unfolded = []
-        for r in range(unfolded_grid.shape[0]):
-            for c in range(unfolded_grid.shape[1]):
-                if unfolded_grid[r, c] >= 0:
-                    unfolded.append(unfolded_grid[r, c])
-
-        self._unfolded = numpy.asarray(unfolded)
+        # STATE INDICES IN PRINTING ORDER, ROW BY ROW
+        self._unfolded = unfolded_grid[unfolded_grid >= 0].astype(self._index_dtype)
 
         # OPERATIONS
 
-        uw_move = lambda layer: uw_move(layer - 1)[self.perm_u(layer)] if layer > 0 else self.perm_u(layer)
-        fw_move = lambda layer: fw_move(layer - 1)[self.perm_f(layer)] if layer > 0 else self.perm_f(layer)
-        rw_move = lambda layer: rw_move(layer - 1)[self.perm_r(layer)] if layer > 0 else self.perm_r(layer)
+        if lazy:
+            # PERMUTATIONS ARE BUILT ON FIRST USE, ONLY THE MOST RECENTLY USED ONES ARE KEPT
+            specs = self._move_specs()
+            self._moves = LazyMoveTable([spec for table in specs for spec in table], self._perm_spec,
+                                        self._LAZY_CACHE_SIZE)
+            tables = [self._moves.subset(table) for table in specs]
+        else:
+            tables = self._MOVE_TABLES.get(self._n)
+            if tables is None:
+                tables = self._load_move_tables()
+                self._MOVE_TABLES[self._n] = tables
+
+        self._rotations, self._outer_layer_moves, self._inner_layer_moves, self._outer_block_moves = tables
+
+        if not lazy:
+            self._moves = dict(**self._rotations, **self._outer_layer_moves, **self._inner_layer_moves,
+                               **self._outer_block_moves)
+
+        self._compiled = CompiledMovesCache(self._moves, self.perm_id, self._COMPILED_CACHE_SIZE,
+                                            self._LAZY_COMPILED_CACHE_BYTES if lazy else self._COMPILED_CACHE_BYTES)
+
+        # SPARSE (MOVED STICKERS ONLY) FORM OF EACH MOVE, BUILT ON FIRST USE
+        self._sparse_moves = {}
+
+        # THE 24 WHOLE-CUBE ROTATIONS, BUILT ON FIRST USE
+        self._rotation_group = None
+
+        # MOVE NAME <-> SPEC LOOKUP FOR SIMPLIFYING MOVE SEQUENCES, BUILT ON FIRST USE
+        self._move_spec = None
+        self._spec_move = None
+
+        self._ldb_l = self._idx_6nn[5, self._n - 1, 0]
+        self._ldb_d = self._idx_6nn[1, self._n - 1, 0]
+        self._ldb_b = self._idx_6nn[3, self._n - 1, self._n - 1]
+
+    def _move_specs(self):
+
+        # EVERY MOVE IS (name, axis, first layer, last layer, quarter turns) ON THE U, F OR R AXIS,
+        # LAYERS COUNTED FROM THE U, F OR R FACE; D, B AND L MOVES ARE THE INVERSE TURNS
 
         inner_layer_moves = []
         outer_layer_moves = []
         for m in range((self._n + 1) // 2):
-            u = self.perm_u(m)
-            f = self.perm_f(m)
-            r = self.perm_r(m)
-            for p, l in [(u, 'U'), (f, 'F'), (r, 'R')]:
-                if m == 0:
-                    outer_layer_moves.append((f'{l}', p))
-                    outer_layer_moves.append((f'{l}2', p[p]))
-                    outer_layer_moves.append((f'{l}\'', p[p[p]]))
-                else:
-                    inner_layer_moves.append((f'{m + 1}{l}', p))
-                    inner_layer_moves.append((f'{m + 1}{l}2', p[p]))
-                    inner_layer_moves.append((f'{m + 1}{l}\'', p[p[p]]))
-
-            for p, l in [(u[u[u]], 'D'), (f[f[f]], 'B'), (r[r[r]], 'L')]:
-                if m == self._n - 1:
-                    outer_layer_moves.append((f'{l}', p))
-                    outer_layer_moves.append((f'{l}2', p[p]))
-                    outer_layer_moves.append((f'{l}\'', p[p[p]]))
-                else:
-                    inner_layer_moves.append((f'{self._n - m}{l}', p))
-                    inner_layer_moves.append((f'{self._n - m}{l}2', p[p]))
-                    inner_layer_moves.append((f'{self._n - m}{l}\'', p[p[p]]))
+            for a, l in [('U', 'U'), ('F', 'F'), ('R', 'R')]:
+                for s, t in self._POWERS:
+                    if m == 0:
+                        outer_layer_moves.append((f'{l}{s}', a, m, m, t))
+                    else:
+                        inner_layer_moves.append((f'{m + 1}{l}{s}', a, m, m, t))
+
+            for a, l in [('U', 'D'), ('F', 'B'), ('R', 'L')]:
+                for s, t in self._POWERS:
+                    if m == self._n - 1:
+                        outer_layer_moves.append((f'{l}{s}', a, m, m, 4 - t))
+                    else:
+                        inner_layer_moves.append((f'{self._n - m}{l}{s}', a, m, m, 4 - t))
 
         outer_block_moves = []
         for m in range((self._n + 1) // 2):
-            uw = uw_move(m)
-            fw = fw_move(m)
-            rw = rw_move(m)
-            for p, l in [(uw, 'Uw'), (fw, 'Fw'), (rw, 'Rw')]:
-                if m != 0:
-                    outer_block_moves.append((f'{m + 1}{l}', p))
-                    outer_block_moves.append((f'{m + 1}{l}2', p[p]))
-                    outer_block_moves.append((f'{m + 1}{l}\'', p[p[p]]))
-
-            for p, l in [(uw[uw[uw]], 'Dw'), (fw[fw[fw]], 'Bw'), (rw[rw[rw]], 'Lw')]:
-                if m != self._n - 1:
-                    outer_block_moves.append((f'{self._n - m}{l}', p))
-                    outer_block_moves.append((f'{self._n - m}{l}2', p[p]))
-                    outer_block_moves.append((f'{self._n - m}{l}\'', p[p[p]]))
-
-        y = uw_move(self._n - 1)
-        z = fw_move(self._n - 1)
-        x = rw_move(self._n - 1)
+            for a, l in [('U', 'Uw'), ('F', 'Fw'), ('R', 'Rw')]:
+                for s, t in self._POWERS:
+                    if m != 0:
+                        outer_block_moves.append((f'{m + 1}{l}{s}', a, 0, m, t))
+
+            for a, l in [('U', 'Dw'), ('F', 'Bw'), ('R', 'Lw')]:
+                for s, t in self._POWERS:
+                    if m != self._n - 1:
+                        outer_block_moves.append((f'{self._n - m}{l}{s}', a, 0, m, 4 - t))
 
         rotations = []
-        for p, l in [(x, 'X'), (y, 'Y'), (z, 'Z')]:
-            rotations.append((f'{l}', p))
-            rotations.append((f'{l}2', p[p]))
-            rotations.append((f'{l}\'', p[p[p]]))
+        for a, l in [('R', 'X'), ('U', 'Y'), ('F', 'Z')]:
+            for s, t in self._POWERS:
+                rotations.append((f'{l}{s}', a, 0, self._n - 1, t))
 
-        self._rotations = {k: v for k, v in rotations}
-        self._outer_layer_moves = {k: v for k, v in outer_layer_moves}
-        self._inner_layer_moves = {k: v for k, v in inner_layer_moves}
-        self._outer_block_moves = {k: v for k, v in outer_block_moves}
+        return rotations, outer_layer_moves, inner_layer_moves, outer_block_moves
 
-        self._moves = dict(**self._rotations, **self._outer_layer_moves, **self._inner_layer_moves,
-                           **self._outer_block_moves)
+    def _build_move_tables(self):
 
-        self._ldb_l = self._idx_6nn[5, self._n - 1, 0]
-        self._ldb_d = self._idx_6nn[1, self._n - 1, 0]
-        self._ldb_b = self._idx_6nn[3, self._n - 1, self._n - 1]
+        perm_layer = {'U': self.perm_u, 'F': self.perm_f, 'R': self.perm_r}
+        layers = {}
+
+        # BLOCKS ARE BUILT ONE LAYER AT A TIME ON TOP OF THE NEXT SHALLOWER BLOCK
+        def perm_layers(a, lo, hi):
+            if (a, lo, hi) not in layers:
+                if lo == hi:
+                    layers[(a, lo, hi)] = perm_layer[a](lo)
+                else:
+                    layers[(a, lo, hi)] = perm_layers(a, lo, hi - 1)[perm_layers(a, hi, hi)]
+            return layers[(a, lo, hi)]
+
+        for a in perm_layer:
+            for hi in range(self._n):
+                perm_layers(a, 0, hi)
+
+        tables = []
+        for specs in self._move_specs():
+            table = {}
+            for name, a, lo, hi, t in specs:
+                p = perm_layers(a, lo, hi)
+                for _ in range(t - 1):
+                    p = p[perm_layers(a, lo, hi)]
+                p.flags.writeable = False
+                table[name] = p
+            tables.append(table)
+
+        return tables
+
+    def _perm_spec(self, a, lo, hi, t):
+
+        perm_layer = {'U': self.perm_u, 'F': self.perm_f, 'R': self.perm_r}[a]
+
+        p = perm_layer(lo)
+        for layer in range(lo + 1, hi + 1):
+            p = p[perm_layer(layer)]
+
+        q = p
+        for _ in range(t - 1):
+            q = q[p]
+
+        return q
+
+    def _load_move_tables(self):
+
+        if self._cache_dir is None:
+            return self._build_move_tables()
+
+        tables = load_move_tables(self._cache_dir, self._n, self._index_dtype)
+        if tables is None:
+            tables = self._build_move_tables()
+            save_move_tables(self._cache_dir, self._n, tables)
+
+        return tables
 
     def perm_id(self):
         return self._idx.copy()
@@ -190,66 +293,326 @@ class RubikCubePermutation(object):
 
         return idx_6nn.flatten()
 
+    def _build_move_spec_index(self):
+        rotations, outer_layer_moves, inner_layer_moves, outer_block_moves = self._move_specs()
+
+        self._move_spec = {}
+        self._spec_move = {}
+        for specs in [outer_layer_moves, inner_layer_moves, outer_block_moves, rotations]:
+            for name, a, lo, hi, t in specs:
+                self._move_spec[name] = (a, lo, hi, t)
+                self._spec_move.setdefault((a, lo, hi, t), name)
+
+    def normalize_moves(self, moves: str):
+        if self._move_spec is None:
+            self._build_move_spec_index()
+
+        # CONSECUTIVE MOVES ON THE SAME AXIS COMMUTE, THEY ARE COLLECTED INTO ONE GROUP WHERE TURNS OF THE SAME
+        # LAYERS ADD UP MODULO 4; A GROUP THAT CANCELS OUT LETS ITS NEIGHBOURS MERGE
+        groups = []
+        for move in moves.strip().split():
+            a, lo, hi, t = self._move_spec[move]
+
+            if groups and groups[-1][0] == a:
+                layers = groups[-1][1]
+                layers[(lo, hi)] = (layers.get((lo, hi), 0) + t) % 4
+                if layers[(lo, hi)] == 0:
+                    del layers[(lo, hi)]
+                    if not layers:
+                        groups.pop()
+            else:
+                groups.append((a, {(lo, hi): t}))
+
+        return [self._spec_move[(a, lo, hi, layers[(lo, hi)])] for a, layers in groups for lo, hi in sorted(layers)]
+
+    def simplify_moves(self, moves: str):
+        return ' '.join(self.normalize_moves(moves))
+
+    def compile_moves(self, moves: str):
+        return self._compiled.get_moves(moves, self.normalize_moves)
+
     def perm_moves(self, moves: str):
+        # A WRITABLE COPY; compile_moves(moves).perm IS THE CACHED, READ-ONLY PERMUTATION ITSELF
+        return self.compile_moves(moves).perm.copy()
+
+    def sparse_move(self, move: str):
+        sp = self._sparse_moves.get(move)
+        if sp is None:
+            sp = SparsePermutation.from_dense(self._moves[move])
+            self._sparse_moves[move] = sp
+
+        return sp
+
+    def sparse_perm_moves(self, moves: str):
         move_list = [move.strip() for move in moves.strip().split()]
 
-        p = self._moves[move_list[0]]
+        sp = self.sparse_move(move_list[0])
         for i in range(1, len(move_list)):
-            p = p[self._moves[move_list[i]]]
+            sp = sp.compose(self.sparse_move(move_list[i]))
 
-        return p
+        return sp
 
-    def print_definition(self):
+    def perm_table(self, moves):
+        # STACKED (len(moves), 6nn) TABLE, ROW i IS THE PERMUTATION OF moves[i]
+        return numpy.stack([self._moves[move] for move in moves])
 
-        print('# State indices, face indices, orientation [U]P [D]OWN [F]RONT [B]ACK [L]EFT [R]IGHT:')
-        for r in range(self._unfolded_grid.shape[0]):
-            for c in range(self._unfolded_grid.shape[1]):
-                if self._unfolded_grid[r, c] < 0:
-                    print(f' {" ":{self._field_width}s} ', end='')
-                else:
-                    print(f' {self._unfolded_grid[r, c]:{self._field_width}d} ', end='')
+    def _net_rows(self, labels):
+        # ROWS OF THE UNFOLDED NET WITH labels, ONE FORMATTED CELL STRING PER STATE INDEX, AND BLANK EMPTY CELLS
+        cells = numpy.full(self._unfolded_grid.shape, f' {" ":{self._field_width}s} ', dtype=object)
+        cells[self._unfolded_grid >= 0] = numpy.asarray(labels, dtype=object)[self._unfolded]
+        return [''.join(row) for row in cells]
 
-            print(f'   {" ":{self._field_width}s}   ', end='')
+    def format_definition(self):
+        w = self._field_width
+        gap = f'   {" ":{w}s}   '
 
-            for c in range(self._unfolded_grid.shape[1]):
-                if self._unfolded_grid[r, c] < 0:
-                    print(f' {" ":{self._field_width}s} ', end='')
-                else:
-                    print(f' {self._face_idx[self._unfolded_grid[r, c]]:{self._field_width}d} ',
-                          end='')
+        idx_rows = self._net_rows([f' {i:{w}d} ' for i in range(6 * self._n2)])
+        face_rows = self._net_rows(numpy.array([f' {f:{w}d} ' for f in range(6)], dtype=object)[self._face_idx])
+        name_rows = self._net_rows(
+            numpy.array([f' {f:>{w}s} ' for f in self._INVERSE_FACE], dtype=object)[self._face_idx])
 
-            print(f'   {" ":{self._field_width}s}   ', end='')
+        lines = ['# State indices, face indices, orientation [U]P [D]OWN [F]RONT [B]ACK [L]EFT [R]IGHT:']
+        lines += [i + gap + f + gap + m for i, f, m in zip(idx_rows, face_rows, name_rows)]
 
-            for c in range(self._unfolded_grid.shape[1]):
-                if self._unfolded_grid[r, c] < 0:
-                    print(f' {" ":{self._field_width}s} ', end='')
-                else:
-                    print(
-                        f' {self._INVERSE_FACE[self._face_idx[self._unfolded_grid[r, c]]]:>{self._field_width}s} ',
-                        end='')
+        return '\n'.join(lines) + '\n\n'
 
-            print()
-        print()
+    def print_definition(self, file=None):
+        print(self.format_definition(), end='', file=file)
 
     def initial_state(self):
-        return numpy.array(range(6 * self._n ** 2), dtype=int) // self._n ** 2
-
-    def is_state_ldb_normalized(self, state):
+        return self._face_idx.copy()
 
-        return state[self._ldb_l] == 5 and state[self._ldb_d] == 1 and state[self._ldb_b] == 3
+    # STATE CHECKS TAKE ONE STATE OR AN (N, 6nn) BATCH OF STATES AND RETURN A BOOLEAN OR AN (N,) BOOLEAN ARRAY
 
-    def is_state_solved(self, state):
+    @staticmethod
+    def _check_result(result):
+        # A PYTHON bool FOR ONE STATE
+        return bool(result) if result.ndim == 0 else result
 
-        idx = 0
-        for f in range(6):
-            ref = state[idx]
-            idx += 1
-            for i in range(1, self._n2):
-                if ref != state[idx]:
-                    return False
-                idx += 1
+    def is_state_ldb_normalized(self, state):
+        state = numpy.asarray(state)
+        return self._check_result(
+            (state[..., self._ldb_l] == 5) & (state[..., self._ldb_d] == 1) & (state[..., self._ldb_b] == 3))
 
-        return True
+    def is_state_solved(self, state):
+        state = numpy.asarray(state)
+        state_6n2 = state.reshape(state.shape[:-1] + (6, self._n2))
+        return self._check_result((state_6n2 == state_6n2[..., :1]).all(axis=(-2, -1)))
+
+    def is_state_faces_solved(self, state, faces):
+        # EACH OF THE GIVEN FACES ('U', 'F', ... OR FACE INDICES) IS A SINGLE COLOR
+        faces = [self._FACE[f] if isinstance(f, str) else f for f in faces]
+        state = numpy.asarray(state)
+        state_6n2 = state.reshape(state.shape[:-1] + (6, self._n2))[..., faces, :]
+        return self._check_result((state_6n2 == state_6n2[..., :1]).all(axis=(-2, -1)))
+
+    def sticker_mask(self, mask):
+        # STATE INDICES OF A BOOLEAN (6nn,) OR (6, n, n) MASK, INDEX ARRAYS ARE RETURNED AS THEY ARE
+        mask = numpy.asarray(mask)
+        if mask.dtype == bool:
+            return numpy.flatnonzero(mask).astype(self._index_dtype)
+        return mask
+
+    def is_state_stickers_solved(self, state, mask, goal=None):
+        # THE MASKED STICKERS HAVE THEIR COLOR IN goal, THE INITIAL STATE BY DEFAULT
+        idx = self.sticker_mask(mask)
+        goal = self._face_idx if goal is None else numpy.asarray(goal)
+        return self._check_result((numpy.asarray(state)[..., idx] == goal[idx]).all(axis=-1))
+
+    # PACKED STATES: 3 BITS PER STICKER, FOR ONE STATE OR AN (N, 6nn) BATCH
+
+    def pack_state(self, state):
+        return pack_states(state)
+
+    def unpack_state(self, packed):
+        return unpack_states(packed, 6 * self._n2)
+
+    def hash_state(self, state):
+        # STABLE 64-BIT HASH, THE SAME ACROSS PROCESSES AND MACHINES
+        return hash_states(state)
+
+    # GEOMETRY: LAYERS AND PIECES OF THE STICKERS
+
+    def sticker_layers(self):
+        # (6nn, 3) LAYER OF EVERY STICKER ALONG THE U, F AND R AXES, COUNTED FROM THE U, F AND R FACES
+        layers = numpy.empty((6 * self._n2, 3), dtype=int)
+        for j, perm_layer in enumerate([self.perm_u, self.perm_f, self.perm_r]):
+            for layer in range(self._n):
+                layers[perm_layer(layer) != self._idx, j] = layer
+
+        # A CENTER STICKER DOES NOT MOVE WHEN ITS OWN FACE TURNS, THE FACE GIVES ITS LAYER
+        for j, (near, far) in enumerate([('U', 'D'), ('F', 'B'), ('R', 'L')]):
+            layers[self._face_idx == self._FACE[near], j] = 0
+            layers[self._face_idx == self._FACE[far], j] = self._n - 1
+
+        return layers
+
+    def corner_stickers(self):
+        # (8, 3) STICKERS OF THE CORNER AT LAYERS (u, f, r) IN {0, n - 1}, CORNER 4 * (u > 0) + 2 * (f > 0) + (r > 0);
+        # EACH CORNER STARTS WITH ITS U OR D STICKER AND GOES CLOCKWISE, SO A TWIST IS A CYCLIC SHIFT
+        layers = self.sticker_layers()
+        axis = self._face_idx // 2
+        far = layers == self._n - 1
+
+        corners = numpy.empty((8, 3), dtype=self._index_dtype)
+        for i in numpy.flatnonzero(((layers == 0) | far).all(axis=1)):
+            u, f, r = far[i].astype(int)
+            # U, R, F IS CLOCKWISE AROUND THE UFR CORNER, EVERY MIRRORED AXIS REVERSES IT
+            order = [0, 2, 1] if (u + f + r) % 2 == 0 else [0, 1, 2]
+            corners[4 * u + 2 * f + r, order.index(axis[i])] = i
+
+        return corners
+
+    def edge_stickers(self):
+        # (12, 2) STICKERS OF THE MIDDLE EDGES OF AN ODD CUBE, EDGE 4 * axis + 2 * (first other layer > 0) + (second
+        # other layer > 0) WHERE axis IS THE AXIS IT IS IN THE MIDDLE LAYER OF; EACH EDGE STARTS WITH ITS STICKER ON
+        # THE U / D, ELSE ON THE F / B FACE, SO THE FLIPS OF FACE TURNS ADD UP TO AN EVEN NUMBER
+        if self._n % 2 == 0 or self._n < 3:
+            raise ValueError('Only odd cubes from the 3x3x3 have middle edges')
+
+        layers = self.sticker_layers()
+        axis = self._face_idx // 2
+        middle = layers == self._n // 2
+        far = (layers == self._n - 1).astype(int)
+
+        edges = numpy.empty((12, 2), dtype=self._index_dtype)
+        for i in numpy.flatnonzero((middle.sum(axis=1) == 1) & ((layers == 0) | middle | (far == 1)).all(axis=1)):
+            a = numpy.flatnonzero(middle[i])[0]
+            b, c = [j for j in range(3) if j != a]
+            edges[4 * a + 2 * far[i, b] + far[i, c], 0 if axis[i] == b else 1] = i
+
+        return edges
+
+    # SYMMETRY: THE 24 ORIENTATIONS OF THE WHOLE CUBE
+
+    def rotation_group(self):
+        # (24, 6nn) ROTATION PERMUTATIONS, THE IDENTITY FIRST, AND THEIR SHORTEST X, Y, Z NAMES
+        if self._rotation_group is None:
+            names = ['']
+            perms = [self.perm_id()]
+            seen = {perms[0].tobytes()}
+
+            for name, p in zip(names, perms):
+                for r in ['X', 'Y', 'Z', 'X\'', 'Y\'', 'Z\'', 'X2', 'Y2', 'Z2']:
+                    q = p[self._rotations[r]]
+                    if q.tobytes() not in seen:
+                        seen.add(q.tobytes())
+                        names.append(self.simplify_moves(f'{name} {r}'))
+                        perms.append(q)
+
+            self._rotation_group = (numpy.stack(perms), names)
+
+        return self._rotation_group
+
+    def _rotation_recolor(self):
+        # (24, 6) COLOR RELABELLING PER ROTATION THAT TURNS THE ROTATED SOLVED CUBE BACK TO THE INITIAL COLORS
+        perms, _ = self.rotation_group()
+        face_colors = self._face_idx[perms][:, ::self._n2]
+
+        recolor = numpy.empty((len(perms), 6), dtype=self._STATE_DTYPE)
+        recolor[numpy.arange(len(perms))[:, None], face_colors] = numpy.arange(6, dtype=self._STATE_DTYPE)
+        return recolor
+
+    def canonical_state(self, state, recolor=False, chunk_size: int = 8192):
+        # THE LEXICOGRAPHICALLY SMALLEST OF THE 24 ROTATED STATES, WITH recolor EACH ROTATED STATE IS ALSO RELABELLED
+        # SO THE SOLVED CUBE KEEPS ITS COLORS (SYMMETRY BY CONJUGATION); RETURNS THE CANONICAL STATES AND THE INDEX
+        # INTO rotation_group() OF THE ROTATION USED, FOR ONE STATE OR AN (N, 6nn) BATCH
+        perms, _ = self.rotation_group()
+        recolors = self._rotation_recolor() if recolor else None
+        offsets = (6 * numpy.arange(len(perms), dtype=self._STATE_DTYPE))[:, None]
+
+        states = numpy.atleast_2d(state)
+        canonical = numpy.empty_like(states)
+        rotation = numpy.empty(len(states), dtype=numpy.int8)
+
+        for start in range(0, len(states), chunk_size):
+            chunk = states[start:start + chunk_size]
+            candidates = chunk[:, perms]
+            if recolor:
+                candidates = recolors.ravel()[candidates + offsets]
+
+            # STICKERS IN GROUPS OF 21 AS 64-BIT WORDS, THE WORDS COMPARE IN THE SAME ORDER AS THE STATES
+            columns = numpy.concatenate([candidates, numpy.zeros(candidates.shape[:-1] + (-candidates.shape[-1] % 21,),
+                                                                 dtype=candidates.dtype)], axis=-1)
+            columns = columns.reshape(columns.shape[:-1] + (-1, 21))
+            words = numpy.einsum('...i,i->...', columns, self._LEX_POWERS, dtype=numpy.uint64, casting='unsafe')
+
+            alive = numpy.ones(words.shape[:2], dtype=bool)
+            for i in range(words.shape[-1]):
+                word = numpy.where(alive, words[..., i], numpy.iinfo(numpy.uint64).max)
+                alive &= word == word.min(axis=1)[:, None]
+
+            k = numpy.argmax(alive, axis=1)
+            canonical[start:start + chunk_size] = candidates[numpy.arange(len(chunk)), k]
+            rotation[start:start + chunk_size] = k
+
+        if numpy.ndim(state) == 1:
+            return canonical[0], rotation[0]
+        return canonical, rotation
+
+    def canonical_hash(self, state, recolor=False):
+        return self.hash_state(self.canonical_state(state, recolor)[0])
+
+    # CYCLE STRUCTURE: perms IS A MOVE SEQUENCE, A CompiledMoves, ONE PERMUTATION OR AN (N, 6nn) BATCH
+
+    def _as_perms(self, perms):
+        if isinstance(perms, str):
+            return self.compile_moves(perms).perm
+        if isinstance(perms, CompiledMoves):
+            return perms.perm
+        return numpy.asarray(perms)
+
+    def sticker_kinds(self):
+        # (6nn,) KIND OF EVERY STICKER BY THE NUMBER OF OUTER LAYERS IT IS IN, AN INDEX INTO _STICKER_KINDS: 0 CORNER,
+        # 1 EDGE (WINGS INCLUDED), 2 CENTER; THE STICKERS OF THE 1x1x1 ARE CENTERS
+        if self._n == 1:
+            return numpy.full(6, 2)
+
+        layers = self.sticker_layers()
+        return 3 - ((layers == 0) | (layers == self._n - 1)).sum(axis=1)
+
+    def perm_cycles(self, perms):
+        # DISJOINT CYCLES OF LENGTH 2 OR MORE, POSITION x TAKES THE STICKER AT p[x]: A LIST OF POINT ARRAYS, A LIST OF
+        # THEM FOR A BATCH
+        perms = self._as_perms(perms)
+        cycles = cycle_decomposition(perms)
+        return cycles if perms.ndim == 2 else cycles[0]
+
+    def perm_order(self, perms):
+        # NUMBER OF TIMES THE SEQUENCE IS APPLIED BEFORE THE CUBE IS BACK WHERE IT STARTED
+        perms = self._as_perms(perms)
+        orders = perm_orders(perms)
+        return orders if perms.ndim == 2 else int(orders[0])
+
+    def perm_cycle_structure(self, perms):
+        # FOR EVERY KIND OF STICKER: THE ORDER ON THOSE STICKERS, THE NUMBER OF MOVED STICKERS AND OF CYCLES
+        perms = self._as_perms(perms)
+        labels, lengths = cycle_labels(perms)
+        kinds = self.sticker_kinds()
+        idx = numpy.arange(6 * self._n2)
+
+        structure = {}
+        for kind, name in enumerate(self._STICKER_KINDS):
+            mask = kinds == kind
+            values = {'order': lcm_rows(numpy.where(mask, lengths, 1)),
+                      'moved': (lengths[:, mask] > 1).sum(axis=1),
+                      'cycles': ((labels == idx) & (lengths > 1))[:, mask].sum(axis=1)}
+            structure[name] = values if perms.ndim == 2 else {key: int(v[0]) for key, v in values.items()}
+
+        return structure
+
+    def perm_power(self, perms, k: int):
+        # THE SEQUENCE APPLIED k TIMES (NEGATIVE k FOR THE INVERSE) AS ONE PERMUTATION, BY ROTATING EVERY CYCLE, SO
+        # THE COST DOES NOT DEPEND ON k
+        perms = self._as_perms(perms)
+        powered = power_perms(perms, k).astype(self._index_dtype)
+        return powered if perms.ndim == 2 else powered[0]
+
+
+# ENTRY POINTS COUNTED WHEN INSTRUMENTATION IS ENABLED
+for _method in ['__init__', 'perm_moves', 'is_state_solved']:
+    instrumentation.register(RubikCubePermutation, _method)
+del _method
 
 
 if __name__ == "__main__":
@@ -0,0 +1,170 @@
+# Copyright 2021 David Zsolt Manrique
+#
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 2 of the License, or (at
+# your option) any later version.
+#
+# This program is distributed in the hope that it will be useful, but
+# WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the GNU
+# General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program; if not, write to the Free Software
+# Foundation, Inc., 51 Franklin Street, Fifth Floor, Boston, MA
+# 02110-1301 USA.
+
+import weakref
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing.shared_memory import SharedMemory
+
+import numpy
+
+from .rubik_cube_scrambler import RubikCubeScrambler, scramble_indices, seed_sequence
+
+# MOVE TABLES AND SETTINGS OF A WORKER PROCESS, SET BY _init_worker
+_worker = {}
+
+
+def _attach(name: str):
+    # WORKERS ONLY BORROW THE SEGMENTS, THE POOL THAT CREATED THEM UNLINKS THEM; BEFORE PYTHON 3.13 THE WORKERS SHARE
+    # THE RESOURCE TRACKER OF THE POOL, WHERE THE SEGMENT IS ALREADY REGISTERED
+    try:
+        return SharedMemory(name=name, track=False)
+    except TypeError:
+        return SharedMemory(name=name)
+
+
+def _init_worker(table_name: str, table_shape, table_dtype, move_rows, scrambler_rows, axis_moves, initial_state):
+    _worker['table_shm'] = _attach(table_name)
+    _worker['table'] = numpy.ndarray(table_shape, dtype=table_dtype, buffer=_worker['table_shm'].buf)
+    _worker['move_rows'] = move_rows
+    _worker['scrambler_rows'] = scrambler_rows
+    _worker['axis_moves'] = axis_moves
+    _worker['initial_state'] = initial_state
+
+
+def _apply_rows(rows):
+    table = _worker['table']
+
+    states = numpy.tile(_worker['initial_state'], (rows.shape[0], 1))
+    for i in range(rows.shape[1]):
+        states = numpy.take_along_axis(states, table[rows[:, i]], axis=1)
+
+    return states
+
+
+def _write_states(out_name: str, out_shape, start: int, states):
+    shm = _attach(out_name)
+    try:
+        out = numpy.ndarray(out_shape, dtype=states.dtype, buffer=shm.buf)
+        out[start:start + len(states)] = states
+    finally:
+        shm.close()
+
+
+def _run_moves(out_name: str, out_shape, start: int, moves):
+    move_rows = _worker['move_rows']
+    move_lists = [m.split() for m in moves]
+
+    # SHORTER SEQUENCES ARE PADDED WITH THE IDENTITY, THE LAST ROW OF THE TABLE
+    rows = numpy.full((len(move_lists), max([len(m) for m in move_lists], default=0)), len(move_rows))
+    for i, move_list in enumerate(move_lists):
+        rows[i, :len(move_list)] = [move_rows[m] for m in move_list]
+
+    _write_states(out_name, out_shape, start, _apply_rows(rows))
+
+
+def _run_scramble(out_name: str, out_shape, start: int, count: int, length: int, seed_sequence):
+    indices = scramble_indices(_worker['axis_moves'], count, length, numpy.random.default_rng(seed_sequence))
+    _write_states(out_name, out_shape, start, _apply_rows(_worker['scrambler_rows'][indices]))
+    return indices
+
+
+def _release(executor, table_shm):
+    executor.shutdown()
+    table_shm.close()
+    table_shm.unlink()
+
+
+class RubikCubePool(RubikCubeScrambler):
+
+    def __init__(self, n: int, processes: int = None):
+        super().__init__(n)
+
+        # ALL MOVES AND THE IDENTITY AS ONE TABLE IN SHARED MEMORY, WORKERS GATHER FROM IT WITHOUT COPYING
+        names = list(self._moves.keys())
+        table = numpy.vstack([self.perm_table(names), self.perm_id()])
+
+        self._table_shm = SharedMemory(create=True, size=table.nbytes)
+        shared = numpy.ndarray(table.shape, dtype=table.dtype, buffer=self._table_shm.buf)
+        shared[:] = table
+
+        move_rows = {name: i for i, name in enumerate(names)}
+        scrambler_rows = numpy.array([move_rows[m] for m in self._scrambler_moves])
+
+        self._executor = ProcessPoolExecutor(
+            processes, initializer=_init_worker,
+            initargs=(self._table_shm.name, table.shape, table.dtype, move_rows, scrambler_rows, self._axis_moves,
+                      self.initial_state()))
+
+        # A POOL THAT IS NEVER CLOSED STILL SHUTS DOWN AND UNLINKS ITS TABLE WHEN IT IS COLLECTED OR AT EXIT
+        self._finalizer = weakref.finalize(self, _release, self._executor, self._table_shm)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def close(self):
+        self._finalizer()
+        self._executor = None
+
+    def _run(self, count: int, tasks):
+        # EVERY TASK WRITES ITS ROWS INTO ONE PREALLOCATED (count, 6nn) SHARED ARRAY
+        out_shape = (count, 6 * self._n2)
+        out_shm = SharedMemory(create=True, size=max(1, count * 6 * self._n2))
+        try:
+            futures = [self._executor.submit(f, out_shm.name, out_shape, *args) for f, args in tasks]
+            results = [future.result() for future in futures]
+            states = numpy.ndarray(out_shape, dtype=self._STATE_DTYPE, buffer=out_shm.buf).copy()
+        finally:
+            out_shm.close()
+            out_shm.unlink()
+
+        return results, states
+
+    def apply_moves(self, moves, chunk_size: int = 1024):
+        # (len(moves), 6nn) STATES OF THE INITIAL STATE AFTER EACH MOVE SEQUENCE
+        moves = list(moves)
+        tasks = [(_run_moves, (start, moves[start:start + chunk_size])) for start in range(0, len(moves), chunk_size)]
+        _, states = self._run(len(moves), tasks)
+        return states
+
+    def scramble(self, count: int, length: int, seed=None, chunk_size: int = 65536):
+        # SAME SCRAMBLES AS iter_scrambles(length, count, chunk_size, seed), RETURNED AS (MOVE INDICES, STATES)
+        chunk_seeds = seed_sequence(seed)
+
+        tasks = []
+        for start in range(0, count, chunk_size):
+            size = min(chunk_size, count - start)
+            tasks.append((_run_scramble, (start, size, length, chunk_seeds.spawn(1)[0])))
+
+        indices, states = self._run(count, tasks)
+        if indices:
+            indices = numpy.concatenate(indices)
+        else:
+            indices = numpy.zeros((0, length), dtype=self._scrambler_dtype)
+
+        return indices, states
+
+
+if __name__ == "__main__":
+    with RubikCubePool(3, 2) as pool:
+        print(pool.is_state_solved(pool.apply_moves(['U', "R R'", 'F2 F2', 'U 2D'])))
+
+        indices, states = pool.scramble(6, 10, seed=0, chunk_size=4)
+        print(pool.decode(indices))
+        print(pool.is_state_solved(states))
@@ -0,0 +1,106 @@
+# Copyright 2021 David Zsolt Manrique
+#
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 2 of the License, or (at
+# your option) any later version.
+#
+# This program is distributed in the hope that it will be useful, but
+# WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the GNU
+# General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program; if not, write to the Free Software
+# Foundation, Inc., 51 Franklin Street, Fifth Floor, Boston, MA
+# 02110-1301 USA.
+
+import numpy
+from .rubik_cube_permutation import RubikCubePermutation
+
+
+def scramble_indices(axis_moves, count: int, length: int, random):
+    # (count, length) INDICES INTO THE ROWS OF axis_moves, THE MOVES OF EACH AXIS; CONSECUTIVE MOVES ARE NEVER ON THE
+    # SAME AXIS SINCE THOSE COMMUTE AND MERGE
+    axis = numpy.empty((count, length), dtype=numpy.int8)
+    if length > 0:
+        axis[:, 0] = random.integers(0, 3, size=count)
+        axis[:, 1:] = (axis[:, :1] + numpy.cumsum(random.integers(1, 3, size=(count, length - 1)), axis=1)) % 3
+
+    return axis_moves[axis, random.integers(0, axis_moves.shape[1], size=(count, length))]
+
+
+def seed_sequence(seed):
+    # A NEW SeedSequence FOR seed; A SeedSequence OF THE CALLER IS COPIED, spawn() WOULD ADVANCE ITS CHILD COUNTER AND
+    # THE SAME SEED WOULD NOT GIVE THE SAME SCRAMBLES AGAIN
+    if isinstance(seed, numpy.random.SeedSequence):
+        return numpy.random.SeedSequence(seed.entropy, spawn_key=seed.spawn_key, pool_size=seed.pool_size)
+    return numpy.random.SeedSequence(seed)
+
+
+class RubikCubeScrambler(RubikCubePermutation):
+    _AXES = ['U', 'F', 'R']
+
+    def __init__(self, n: int, lazy: bool = False):
+        super().__init__(n, lazy)
+
+        # SAME MOVES AS RubikCube.get_scrambler_moves, GROUPED BY AXIS
+        self._scrambler_moves = sorted(list(self._outer_layer_moves.keys()) + list(self._outer_block_moves.keys()))
+        self._scrambler_dtype = numpy.uint8 if len(self._scrambler_moves) <= 256 else numpy.uint16
+
+        self._build_move_spec_index()
+        self._axis_moves = numpy.array(
+            [[i for i, m in enumerate(self._scrambler_moves) if self._move_spec[m][0] == a] for a in self._AXES],
+            dtype=self._scrambler_dtype)
+
+        self._scrambler_table = None
+
+    def scrambler_moves(self):
+        return list(self._scrambler_moves)
+
+    def axis_moves(self):
+        return self._axis_moves
+
+    def scramble_indices(self, count: int, length: int, random):
+        return scramble_indices(self._axis_moves, count, length, random)
+
+    def decode(self, indices):
+        move_list = numpy.asarray(self._scrambler_moves)
+        return [' '.join(row) for row in move_list[numpy.asarray(indices)]]
+
+    def states(self, indices):
+        if self._scrambler_table is None:
+            self._scrambler_table = self.perm_table(self._scrambler_moves)
+
+        indices = numpy.asarray(indices)
+        states = numpy.tile(self.initial_state(), (indices.shape[0], 1))
+        for i in range(indices.shape[1]):
+            states = numpy.take_along_axis(states, self._scrambler_table[indices[:, i]], axis=1)
+
+        return states
+
+    def iter_scrambles(self, length: int, count: int = None, chunk_size: int = 65536, seed=None,
+                       as_moves: bool = False, with_states: bool = False):
+        # YIELDS count SCRAMBLES (ENDLESSLY IF count IS None) IN CHUNKS OF chunk_size AS (chunk, length) MOVE INDEX
+        # ARRAYS, OR MOVE STRINGS WITH as_moves, PAIRED WITH THE (chunk, 6nn) SCRAMBLED STATES WITH with_states;
+        # EACH CHUNK DRAWS FROM ITS OWN SPAWNED SEED SEQUENCE, SO THE OUTPUT ONLY DEPENDS ON seed AND chunk_size
+        chunk_seeds = seed_sequence(seed)
+
+        produced = 0
+        while count is None or produced < count:
+            size = chunk_size if count is None else min(chunk_size, count - produced)
+            random = numpy.random.default_rng(chunk_seeds.spawn(1)[0])
+
+            indices = self.scramble_indices(size, length, random)
+            scrambles = self.decode(indices) if as_moves else indices
+
+            yield (scrambles, self.states(indices)) if with_states else scrambles
+
+            produced += size
+
+
+if __name__ == "__main__":
+    s = RubikCubeScrambler(3)
+
+    for moves, states in s.iter_scrambles(8, count=5, chunk_size=2, seed=0, as_moves=True, with_states=True):
+        print(moves, s.is_state_solved(states))
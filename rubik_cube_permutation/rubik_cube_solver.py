@@ -0,0 +1,213 @@
+# Copyright 2021 David Zsolt Manrique
+#
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 2 of the License, or (at
+# your option) any later version.
+#
+# This program is distributed in the hope that it will be useful, but
+# WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the GNU
+# General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program; if not, write to the Free Software
+# Foundation, Inc., 51 Franklin Street, Fifth Floor, Boston, MA
+# 02110-1301 USA.
+
+# OPTIMAL SOLVER OF THE 2x2x2 AND 3x3x3 OVER THE OUTER LAYER MOVES (U, F AND R, THE DLB CORNER STAYS IN PLACE):
+# ITERATIVE DEEPENING A* WITH THE MAXIMUM OF PATTERN DATABASES AS HEURISTIC, THE NODES OF THE SEARCH ARE THE LOCATIONS
+# OF THE PIECES AND ARE EXPANDED IN BATCHES
+
+import time
+
+import numpy
+
+from .pattern_database import (UNREACHED, build_pattern_database, load_pattern_database, pattern_size,
+                               piece_move_tables, rank_locations, save_pattern_database)
+from .rubik_cube_permutation import RubikCubePermutation
+
+
+class RubikCubeSolver(RubikCubePermutation):
+
+    # PATTERN DATABASES ARE SHARED BY EVERY SOLVER OF THE SAME SIZE AND OPTIONALLY PERSISTED NEXT TO THE MOVE TABLES
+    _PATTERN_DATABASES = {}
+
+    def __init__(self, n: int):
+        if n not in (2, 3):
+            raise ValueError('The solver supports the 2x2x2 and 3x3x3 cubes only')
+
+        super().__init__(n)
+
+        self._build_move_spec_index()
+        self._solver_moves = list(self._outer_layer_moves.keys())
+        self._solver_axes = numpy.array(['UFR'.index(self._move_spec[m][0]) for m in self._solver_moves])
+        perms = self.perm_table(self._solver_moves)
+
+        # EVERY KIND OF PIECE: (name, stickers, orientations, reached pieces, first column of the node, location offset)
+        kinds = [('corners', self.corner_stickers(), 3)]
+        if n == 3:
+            kinds.append(('edges', self.edge_stickers(), 2))
+
+        self._kinds = []
+        location_tables = []
+        home = []
+        offset = 0
+        for name, stickers, k in kinds:
+            reached, tables = piece_move_tables(stickers, perms)
+            self._kinds.append((name, stickers, k, reached, len(home), offset))
+            location_tables.append(tables + offset)
+            home.extend(numpy.arange(len(reached)) * k + offset)
+            offset += tables.shape[1]
+
+        # NODE: LOCATIONS OF THE REACHED PIECES OF EVERY KIND, ONE TABLE MOVES ALL OF THEM
+        self._location_table = numpy.hstack(location_tables).astype(numpy.int8)
+        self._home = numpy.array(home, dtype=numpy.int8)
+
+        # PATTERNS: (name, node columns, kind); ALL 7 CORNERS, AND TWO OVERLAPPING HALVES OF THE 9 EDGES OF THE 3x3x3
+        patterns = [('corners', slice(0, 7), 0)]
+        if n == 3:
+            patterns += [('edges_0', slice(7, 13), 1), ('edges_1', slice(10, 16), 1)]
+
+        start = time.perf_counter()
+        self._patterns = []
+        for name, columns, kind in patterns:
+            _, _, k, reached, first, offset = self._kinds[kind]
+            tracked = numpy.arange(columns.start, columns.stop) - first
+            drop_last = len(tracked) == len(reached)
+            table = self._pattern_database(name, tables=location_tables[kind] - offset, home=tracked * k,
+                                           slots=len(reached), k=k, drop_last=drop_last)
+            self._patterns.append((columns, offset, len(reached), k, drop_last, table))
+        self._table_load_seconds = time.perf_counter() - start
+
+        self._statistics = {'table_load_seconds': self._table_load_seconds}
+
+    def _pattern_database(self, name: str, tables, home, slots: int, k: int, drop_last: bool):
+        key = (self._n, name)
+        if key not in self._PATTERN_DATABASES:
+            size = pattern_size(slots, len(home), k, drop_last)
+            table = None
+            if self._cache_dir is not None:
+                table = load_pattern_database(self._cache_dir, self._n, name, size)
+
+            if table is None:
+                table = build_pattern_database(tables, home, slots, k, drop_last)
+                if self._cache_dir is not None:
+                    save_pattern_database(self._cache_dir, self._n, name, table)
+
+            self._PATTERN_DATABASES[key] = table
+
+        return self._PATTERN_DATABASES[key]
+
+    def solver_moves(self):
+        return list(self._solver_moves)
+
+    def statistics(self):
+        # TABLE LOAD TIME OF THE SOLVER, NODES, TIME AND NODES PER SECOND OF THE LAST SOLVE
+        return dict(self._statistics)
+
+    def _locations(self, state):
+        # THE NODE OF A STATE: THE PIECE AT EVERY SLOT IS FOUND BY ITS COLORS, ITS ORIENTATION BY WHERE ITS FIRST COLOR IS
+        state = numpy.asarray(state)
+        node = []
+        for name, stickers, k, reached, _, offset in self._kinds:
+            solved = self._face_idx[stickers].astype(int)
+            weights = 6 ** numpy.arange(k - 1, -1, -1)
+
+            pieces = numpy.full(6 ** k, -1)
+            for o in range(k):
+                pieces[numpy.roll(solved, -o, axis=1) @ weights] = numpy.arange(len(stickers)) * k + o
+
+            found = pieces[state[stickers].astype(int) @ weights]
+            piece, orientation = found // k, found % k
+            if (found < 0).any() or len(set(piece)) != len(stickers):
+                raise ValueError(f'The {name} of the state are not valid')
+
+            slots = numpy.zeros(len(stickers), dtype=bool)
+            slots[reached] = True
+            if (found[~slots] != numpy.flatnonzero(~slots) * k).any():
+                raise ValueError(f'The state is not reachable with the moves {" ".join(self._solver_moves)}')
+
+            index = numpy.full(len(stickers), -1)
+            index[reached] = numpy.arange(len(reached))
+            location = numpy.empty(len(stickers), dtype=int)
+            location[piece] = index * k + orientation
+            node.append(location[reached] + offset)
+
+        # THE OUTER LAYER MOVES NEVER MOVE THE CENTERS OF AN ODD CUBE
+        if self._n % 2 == 1 and (state[self._n2 // 2::self._n2] != numpy.arange(6)).any():
+            raise ValueError(f'The state is not reachable with the moves {" ".join(self._solver_moves)}')
+
+        return numpy.concatenate(node).astype(numpy.int8)
+
+    def _heuristic(self, nodes):
+        h = numpy.zeros(len(nodes), dtype=numpy.uint8)
+        for columns, offset, slots, k, drop_last, table in self._patterns:
+            numpy.maximum(h, table[rank_locations(nodes[:, columns] - offset, slots, k, drop_last)], out=h)
+        return h
+
+    def _search(self, root, bound: int, chunk_size: int):
+        # DEPTH FIRST OVER BATCHES OF NODES AT THE SAME DEPTH, CHILDREN WITH A COST ABOVE bound ARE CUT OFF; RETURNS THE
+        # MOVE INDICES OF A SOLUTION OR None, AND THE SMALLEST COST THAT WAS CUT OFF
+        moves = len(self._solver_moves)
+        next_bound = UNREACHED
+        stack = [(root[None], numpy.zeros((1, 0), dtype=numpy.int8))]
+        while stack:
+            nodes, paths = stack.pop()
+            self._nodes += len(nodes)
+            depth = paths.shape[1]
+
+            children = self._location_table[:, nodes].reshape(-1, nodes.shape[1])
+            move = numpy.repeat(numpy.arange(moves, dtype=numpy.int8), len(nodes))
+            parent = numpy.tile(numpy.arange(len(nodes)), moves)
+
+            # TWO MOVES IN A ROW ON THE SAME AXIS ARE ONE MOVE
+            if depth > 0:
+                allowed = self._solver_axes[move] != self._solver_axes[paths[parent, -1]]
+                children, move, parent = children[allowed], move[allowed], parent[allowed]
+
+            solved = numpy.flatnonzero((children == self._home).all(axis=1))
+            if len(solved):
+                return numpy.append(paths[parent[solved[0]]], move[solved[0]]), bound
+
+            cost = depth + 1 + self._heuristic(children).astype(int)
+            keep = cost <= bound
+            if not keep.all():
+                next_bound = min(next_bound, int(cost[~keep].min()))
+
+            children = children[keep]
+            paths = numpy.hstack([paths[parent[keep]], move[keep, None]])
+            for start in reversed(range(0, len(children), chunk_size)):
+                stack.append((children[start:start + chunk_size], paths[start:start + chunk_size]))
+
+        return None, next_bound
+
+    def solve(self, state, chunk_size: int = 4096):
+        # SHORTEST SEQUENCE OF solver_moves() THAT SOLVES THE STATE, IN THE METRIC WHERE U, U2 AND U' ARE ONE MOVE EACH
+        root = self._locations(state)
+
+        self._nodes = 0
+        start = time.perf_counter()
+
+        path = []
+        if not (root == self._home).all():
+            bound = int(self._heuristic(root[None])[0])
+            path = None
+            while path is None:
+                path, bound = self._search(root, bound, chunk_size)
+
+        seconds = time.perf_counter() - start
+        self._statistics = {'table_load_seconds': self._table_load_seconds, 'length': len(path),
+                            'nodes': self._nodes, 'seconds': seconds,
+                            'nodes_per_second': self._nodes / seconds if seconds > 0 else 0.0}
+
+        return ' '.join(self._solver_moves[m] for m in path)
+
+
+if __name__ == "__main__":
+    for n, scramble in [(2, "R U2 F' R U' R2 F U' R F2"), (3, "R U F' R2 U' F R U2 R' F")]:
+        s = RubikCubeSolver(n)
+        state = s.initial_state()[s.perm_moves(scramble)]
+
+        solution = s.solve(state)
+        print(scramble, '->', solution, s.is_state_solved(state[s.perm_moves(solution)]), s.statistics())
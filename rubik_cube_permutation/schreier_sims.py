@@ -0,0 +1,153 @@
+# Copyright 2021 David Zsolt Manrique
+#
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 2 of the License, or (at
+# your option) any later version.
+#
+# This program is distributed in the hope that it will be useful, but
+# WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the GNU
+# General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program; if not, write to the Free Software
+# Foundation, Inc., 51 Franklin Street, Fifth Floor, Boston, MA
+# 02110-1301 USA.
+
+# BASE AND STRONG GENERATING SET OF THE GROUP GENERATED BY PERMUTATIONS OF 0..degree-1 (DETERMINISTIC SCHREIER-SIMS):
+# A PERMUTATION g MAPS THE POINT x TO g[x], THE PRODUCT g h (g FIRST) IS h[g]; LEVEL i OF THE STABILIZER CHAIN HOLDS
+# THE BASE POINT b_i, ITS ORBIT UNDER THE STABILIZER OF b_0..b_{i-1} AND A TRANSVERSAL u_p (b_i MAPS TO p) WITH THE
+# INVERSES; EVERY ELEMENT OF THE GROUP IS ONE PRODUCT u_(last level) ... u_(level 0)
+
+import numpy
+
+
+class _Level(object):
+
+    def __init__(self, base: int, identity):
+        self.base = base
+        self.generators = []
+        self.orbit = {base: (identity, identity)}
+        self.checked = set()
+
+    def add_generator(self, g):
+        self.generators.append(g)
+
+        # EXTEND THE ORBIT WITH THE NEW GENERATOR, u_(s[p]) = u_p s FOR EVERY POINT IT REACHES FIRST
+        queue = list(self.orbit)
+        while queue:
+            p = queue.pop()
+            u = self.orbit[p][0]
+            for s in self.generators:
+                q = int(s[p])
+                if q not in self.orbit:
+                    u_q = s[u]
+                    self.orbit[q] = (u_q, _inverse(u_q))
+                    queue.append(q)
+
+
+def _inverse(g):
+    inverse = numpy.empty_like(g)
+    inverse[g] = numpy.arange(len(g))
+    return inverse
+
+
+def _sift(levels, g, start: int):
+    # STRIP g THROUGH THE LEVELS FROM start: THE RESIDUE AND THE LEVEL WHERE ITS BASE IMAGE LEFT THE ORBIT
+    for j in range(start, len(levels)):
+        entry = levels[j].orbit.get(int(g[levels[j].base]))
+        if entry is None:
+            return g, j
+        g = entry[1][g]
+    return g, len(levels)
+
+
+def schreier_sims(generators, degree: int):
+    # (base points, orbits, transversals, inverse transversals) OF THE GROUP, ONE ARRAY PER LEVEL
+    identity = numpy.arange(degree)
+    generators = [numpy.asarray(g, dtype=numpy.intp) for g in generators]
+    generators = [g for g in generators if (g != identity).any()]
+
+    levels = []
+    for g in generators:
+        if all(g[level.base] == level.base for level in levels):
+            levels.append(_Level(int(numpy.flatnonzero(g != identity)[0]), identity))
+    for i, level in enumerate(levels):
+        for g in generators:
+            if all(g[levels[j].base] == levels[j].base for j in range(i)):
+                level.add_generator(g)
+
+    # THE SCHREIER GENERATORS u_p s u_(s[p])^-1 OF EVERY LEVEL MUST SIFT THROUGH THE LEVELS BELOW; A RESIDUE IS ADDED
+    # AS A STRONG GENERATOR TO THE LEVELS IT FIXES AND THE CHECK RESTARTS THERE. A CHECKED PAIR STAYS CHECKED: ORBITS
+    # ONLY GROW AND THE TRANSVERSAL OF A POINT NEVER CHANGES
+    i = len(levels) - 1
+    while i >= 0:
+        level = levels[i]
+        residue = None
+        for p in list(level.orbit):
+            u_p = level.orbit[p][0]
+            for k, s in enumerate(level.generators):
+                if (p, k) in level.checked:
+                    continue
+                level.checked.add((p, k))
+
+                h, j = _sift(levels, level.orbit[int(s[p])][1][s[u_p]], i + 1)
+                if (h != identity).any():
+                    residue = h, j
+                    break
+            if residue is not None:
+                break
+
+        if residue is None:
+            i -= 1
+            continue
+
+        h, j = residue
+        if j == len(levels):
+            levels.append(_Level(int(numpy.flatnonzero(h != identity)[0]), identity))
+        for level in levels[i + 1:j + 1]:
+            level.add_generator(h)
+        i = j
+
+    base = numpy.array([level.base for level in levels], dtype=numpy.intp)
+    orbits = [numpy.array(list(level.orbit), dtype=numpy.intp) for level in levels]
+    transversals = [numpy.stack([level.orbit[p][0] for p in level.orbit]) for level in levels]
+    inverses = [numpy.stack([level.orbit[p][1] for p in level.orbit]) for level in levels]
+    return base, orbits, transversals, inverses
+
+
+def sift_perms(chain, perms):
+    # WHICH OF THE (N, degree) PERMUTATIONS ARE IN THE GROUP OF THE CHAIN, ALL SIFTED AT ONCE
+    base, orbits, _, inverses = chain
+    perms = numpy.atleast_2d(numpy.asarray(perms, dtype=numpy.intp))
+    rows = numpy.arange(len(perms))
+    member = numpy.ones(len(perms), dtype=bool)
+
+    for b, orbit, inverse in zip(base, orbits, inverses):
+        position = numpy.full(perms.shape[1], -1)
+        position[orbit] = numpy.arange(len(orbit))
+
+        index = position[perms[rows, b]]
+        member &= index >= 0
+        perms = numpy.take_along_axis(inverse[numpy.maximum(index, 0)], perms, axis=1)
+
+    return member & (perms == numpy.arange(perms.shape[1])).all(axis=1)
+
+
+def random_perms(chain, degree: int, count: int, random):
+    # count UNIFORM RANDOM ELEMENTS OF THE GROUP: ONE RANDOM TRANSVERSAL ELEMENT PER LEVEL
+    transversals = chain[2]
+    perms = numpy.tile(numpy.arange(degree), (count, 1))
+
+    for transversal in reversed(transversals):
+        perms = numpy.take_along_axis(transversal[random.randint(len(transversal), size=count)], perms, axis=1)
+
+    return perms
+
+
+def group_order(chain):
+    order = 1
+    for orbit in chain[1]:
+        order *= len(orbit)
+    return order
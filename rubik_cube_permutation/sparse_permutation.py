@@ -0,0 +1,94 @@
+# Copyright 2021 David Zsolt Manrique
+#
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 2 of the License, or (at
+# your option) any later version.
+#
+# This program is distributed in the hope that it will be useful, but
+# WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the GNU
+# General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program; if not, write to the Free Software
+# Foundation, Inc., 51 Franklin Street, Fifth Floor, Boston, MA
+# 02110-1301 USA.
+
+import numpy
+
+
+class SparsePermutation(object):
+    # PERMUTATION p OF size ELEMENTS STORED AS ITS MOVED ELEMENTS ONLY:
+    # dst ARE THE SORTED INDICES WITH p[dst] != dst AND src = p[dst], SO state[p] IS state WITH state[dst] = state[src];
+    # src AND dst ARE intp, WHICH INDEXING USES WITHOUT CONVERTING THEM, dtype IS THE INDEX TYPE OF to_dense()
+
+    def __init__(self, src, dst, size: int, dtype=numpy.intp):
+        self._src = numpy.asarray(src, dtype=numpy.intp)
+        self._dst = numpy.asarray(dst, dtype=numpy.intp)
+        self._size = size
+        self._dtype = dtype
+
+    @classmethod
+    def from_dense(cls, p):
+        p = numpy.asarray(p)
+        dst = numpy.flatnonzero(p != numpy.arange(len(p)))
+        return cls(p[dst], dst, len(p), p.dtype)
+
+    @classmethod
+    def identity(cls, size: int, dtype=numpy.intp):
+        return cls(numpy.zeros(0), numpy.zeros(0), size, dtype)
+
+    def __len__(self):
+        return self._size
+
+    def support(self):
+        return self._dst
+
+    def to_dense(self):
+        p = numpy.arange(self._size, dtype=self._dtype)
+        p[self._dst] = self._src
+        return p
+
+    def inverse(self):
+        order = numpy.argsort(self._src)
+        return SparsePermutation(self._dst[order], self._src[order], self._size, self._dtype)
+
+    def lookup(self, i):
+        # p[i] FOR AN ARRAY OF INDICES i
+        i = numpy.asarray(i)
+        if len(self._dst) == 0:
+            return i.copy()
+
+        k = numpy.minimum(numpy.searchsorted(self._dst, i), len(self._dst) - 1)
+        return numpy.where(self._dst[k] == i, self._src[k], i)
+
+    def apply(self, state):
+        # state[p] IN PLACE, ALSO ON A (N, 6nn) BATCH OF STATES
+        state[..., self._dst] = state[..., self._src]
+        return state
+
+    def compose(self, q):
+        # self THEN q, THE SPARSE COUNTERPART OF p[q]
+        if isinstance(q, SparsePermutation):
+            dst = numpy.union1d(self._dst, q._dst)
+            src = self.lookup(q.lookup(dst))
+            moved = src != dst
+            return SparsePermutation(src[moved], dst[moved], self._size, self._dtype)
+
+        return self.lookup(q)
+
+    def compose_after(self, p):
+        # p THEN self FOR A DENSE p, ONLY THE MOVED ELEMENTS OF self ARE WRITTEN
+        r = numpy.array(p)
+        r[self._dst] = r[self._src]
+        return r
+
+
+if __name__ == "__main__":
+    a = SparsePermutation.from_dense([1, 2, 0, 3, 4])
+    b = SparsePermutation.from_dense([0, 1, 2, 4, 3])
+
+    print(a.compose(b).to_dense())
+    print(a.to_dense()[b.to_dense()])
+    print(a.apply(numpy.array([10, 11, 12, 13, 14])))
@@ -0,0 +1,75 @@
+# Copyright 2021 David Zsolt Manrique
+#
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 2 of the License, or (at
+# your option) any later version.
+#
+# This program is distributed in the hope that it will be useful, but
+# WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the GNU
+# General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program; if not, write to the Free Software
+# Foundation, Inc., 51 Franklin Street, Fifth Floor, Boston, MA
+# 02110-1301 USA.
+
+# STATES PACKED TO 3 BITS PER STICKER (COLORS 0..5), MOST SIGNIFICANT BIT FIRST, AND A STABLE 64-BIT HASH OF THEM;
+# ALL FUNCTIONS WORK ON ONE STATE OR ON THE LAST AXIS OF A BATCH
+
+import numpy
+
+# 8 STICKERS OF 3 BITS FILL 3 BYTES, THE PLACE VALUES OF THE STICKERS IN THAT 24-BIT WORD
+_STICKER_VALUES = numpy.uint32(8) ** numpy.arange(7, -1, -1, dtype=numpy.uint32)
+
+_FNV_OFFSET = numpy.uint64(0xcbf29ce484222325)
+_FNV_PRIME = numpy.uint64(0x100000001b3)
+
+
+def packed_size(size: int):
+    return (3 * size + 7) // 8
+
+
+def pack_states(states):
+    states = numpy.asarray(states, dtype=numpy.uint8)
+    size = states.shape[-1]
+
+    groups = numpy.zeros(states.shape[:-1] + (-(-size // 8) * 8,), dtype=numpy.uint8)
+    groups[..., :size] = states
+    groups = groups.reshape(states.shape[:-1] + (-1, 8))
+
+    # THE LOW 3 BYTES OF THE BIG ENDIAN WORDS ARE THE PACKED BYTES
+    words = numpy.einsum('...i,i->...', groups, _STICKER_VALUES, dtype=numpy.uint32, casting='unsafe')
+    packed = words.astype('>u4').view(numpy.uint8).reshape(words.shape + (4,))[..., 1:]
+    return packed.reshape(states.shape[:-1] + (-1,))[..., :packed_size(size)]
+
+
+def unpack_states(packed, size: int):
+    bits = numpy.unpackbits(numpy.asarray(packed, dtype=numpy.uint8), axis=-1, count=3 * size)
+    bits = bits.reshape(bits.shape[:-1] + (size, 3))
+    return (bits[..., 0] << 2) | (bits[..., 1] << 1) | bits[..., 2]
+
+
+def hash_packed(packed):
+    # FNV-1a OVER LITTLE ENDIAN 64-BIT WORDS OF THE PACKED BYTES, THEN THE SPLITMIX64 FINALIZER
+    packed = numpy.asarray(packed, dtype=numpy.uint8)
+    pad = -packed.shape[-1] % 8
+    if pad:
+        packed = numpy.concatenate([packed, numpy.zeros(packed.shape[:-1] + (pad,), dtype=numpy.uint8)], axis=-1)
+
+    words = numpy.ascontiguousarray(packed).view('<u8')
+
+    # MULTIPLICATION MODULO 2 ** 64 IS INTENDED
+    with numpy.errstate(over='ignore'):
+        h = numpy.full(words.shape[:-1], _FNV_OFFSET, dtype=numpy.uint64)
+        for i in range(words.shape[-1]):
+            h = (h ^ words[..., i]) * _FNV_PRIME
+
+        h = (h ^ (h >> numpy.uint64(30))) * numpy.uint64(0xbf58476d1ce4e5b9)
+        h = (h ^ (h >> numpy.uint64(27))) * numpy.uint64(0x94d049bb133111eb)
+        return h ^ (h >> numpy.uint64(31))
+
+
+def hash_states(states):
+    return hash_packed(pack_states(states))